@@ -0,0 +1,173 @@
+# battleship action_log.py - compact columnar log of game actions
+
+import array  # library for typed compact columns
+import json  # library to write names tables when dumping log
+import time  # library for monotonic nanosecond timestamps
+
+# Outcome codes of logged actions
+MISS = 0
+HIT = 1
+SUNK = 2
+GAME_OVER = 3
+
+HEADER = ["player or CPU", "time", "row", "column", "action outcome"]  # names of readable row fields
+NO_SHIP = 0xFFFF  # ship code of actions without a ship (miss)
+
+
+class ActionLog:
+    """
+    Game actions log kept in typed array columns, one value per action:
+        - players: player code (index in player_names)
+        - times: nanoseconds since the log was started (time.perf_counter_ns)
+        - cells: packed coordinates, row << 16 | column
+        - outcomes: outcome code (MISS, HIT, SUNK or GAME_OVER)
+        - ships: ship name code (index in ship_names), NO_SHIP for misses
+
+    Actions take 16 bytes each, readable rows [player, seconds, row, column, outcome text]
+    are only built when they are asked for.
+    """
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.players = array.array("B")
+        self.times = array.array("q")
+        self.cells = array.array("I")  # 4 bytes, "L" would take 8 bytes on 64-bit Linux
+        self.outcomes = array.array("B")
+        self.ships = array.array("H")
+        self.player_names = []  # player code -> player name
+        self.ship_names = []  # ship code -> ship name
+        self._player_codes = {}  # player name -> player code
+        self._ship_codes = {}  # ship name -> ship code
+
+    def record(self, player, row, column, outcome, ship_name=None):
+        """
+        Log an action.
+
+        Args:
+            player (str): The player making the action ("CPU" or "Human").
+            row (int): Row of the action coordinates.
+            column (int): Column of the action coordinates.
+            outcome (int): Outcome code (MISS, HIT, SUNK or GAME_OVER).
+            ship_name (str): Name of the ship hit or sunk. Default is None.
+        """
+        player_code = self._player_codes.get(player)
+        if player_code is None:
+            player_code = self._player_codes[player] = len(self.player_names)
+            self.player_names.append(player)
+        if ship_name is None:
+            ship_code = NO_SHIP
+        else:
+            ship_code = self._ship_codes.get(ship_name)
+            if ship_code is None:
+                ship_code = self._ship_codes[ship_name] = len(self.ship_names)
+                self.ship_names.append(ship_name)
+        self.players.append(player_code)
+        self.times.append(time.perf_counter_ns() - self.start_ns)
+        self.cells.append(row << 16 | column)
+        self.outcomes.append(outcome)
+        self.ships.append(ship_code)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def copy(self):
+        """Return an independent copy of the log, columns are copied in bulk."""
+        log = ActionLog.__new__(ActionLog)
+        log.start_ns = self.start_ns
+        for column in ("players", "times", "cells", "outcomes", "ships"):
+            setattr(log, column, array.array(getattr(self, column).typecode, getattr(self, column)))
+        log.player_names = list(self.player_names)
+        log.ship_names = list(self.ship_names)
+        log._player_codes = dict(self._player_codes)
+        log._ship_codes = dict(self._ship_codes)
+        return log
+
+    def truncate(self, length):
+        """Drop actions logged after the first length actions, used to undo actions."""
+        for column in (self.players, self.times, self.cells, self.outcomes, self.ships):
+            del column[length:]
+
+    def ship_name(self, index):
+        """Return ship name of the action, None if there was no ship."""
+        ship_code = self.ships[index]
+        return None if ship_code == NO_SHIP else self.ship_names[ship_code]
+
+    def outcome_text(self, index):
+        """Return readable outcome of the action, like "Cruiser was hit"."""
+        outcome = self.outcomes[index]
+        if outcome == MISS:
+            return "it was a MISS"
+        if outcome == HIT:
+            return f"{self.ship_name(index)} was hit"
+        if outcome == SUNK:
+            return f"{self.ship_name(index)} was sunk"
+        return "Game Over"
+
+    def row(self, index):
+        """
+        Return action as readable row.
+
+        Returns:
+            list: [player, seconds since log start, row, column, outcome text].
+        """
+        cell = self.cells[index]
+        return [self.player_names[self.players[index]], self.times[index] / 1e9,
+                cell >> 16, cell & 0xFFFF, self.outcome_text(index)]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("action log index out of range")
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def __repr__(self):
+        return repr([HEADER] + list(self))
+
+    def ships_with_outcome(self, outcome):
+        """Return names of ships of every action with given outcome code, in log order."""
+        return [self.ship_name(index) for index, code in enumerate(self.outcomes) if code == outcome]
+
+    def nbytes(self):
+        """Return memory taken by the columns in bytes."""
+        return sum(column.itemsize * len(column)
+                   for column in (self.players, self.times, self.cells, self.outcomes, self.ships))
+
+    def dump(self, file):
+        """
+        Write the log to a binary file: one JSON line with names tables, then every column in bulk.
+
+        Args:
+            file: File opened in binary mode.
+        """
+        names = {"count": len(self), "players": self.player_names, "ships": self.ship_names}
+        file.write(json.dumps(names).encode() + b"\n")
+        for column in (self.players, self.times, self.cells, self.outcomes, self.ships):
+            column.tofile(file)
+
+    @classmethod
+    def load(cls, file):
+        """
+        Read a log written by dump.
+
+        Args:
+            file: File opened in binary mode.
+
+        Returns:
+            ActionLog: The loaded log.
+        """
+        log = cls()
+        names = json.loads(file.readline())
+        for player in names["players"]:
+            log._player_codes[player] = len(log.player_names)
+            log.player_names.append(player)
+        for ship_name in names["ships"]:
+            log._ship_codes[ship_name] = len(log.ship_names)
+            log.ship_names.append(ship_name)
+        for column in (log.players, log.times, log.cells, log.outcomes, log.ships):
+            column.fromfile(file, names["count"])
+        return log
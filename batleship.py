@@ -1,5 +1,10 @@
 import random
 import copy
+import board
+import map_search
+import layout_sampler
+import table_cache
+import shot_index
 
 
 # Constants for map dimensions and default symbol
@@ -18,7 +23,7 @@ map_player = [[DEFAULT_SYMBOL for _ in range(MAP_HEIGHT)] for _ in range(MAP_WID
 game_result = None  # Store the game result (win, lose, or draw)
 cpu_actions = []  # List to store CPU actions (shots, hit/miss, coordinates)
 player_actions = []  # List to store Player actions (shots)
-cpu_shoot_coordinates_log = [["x","y"]]  # List to store CPU's shot coordinates
+cpu_shoot_coordinates_log = shot_index.ShotIndex()  # CPU's shot coordinates, O(1) membership
 
 
 def initialize_maps(width, height):
@@ -30,6 +35,8 @@ def initialize_maps(width, height):
         list: A 2D list filled with zeros.
     """
     global DEFAULT_SYMBOL  # Declare global variable
+    if width * height >= board.TILED_MIN_CELLS:
+        return board.TiledBoard(width, height, DEFAULT_SYMBOL)  # sparse board for very large maps
     return [[DEFAULT_SYMBOL for _ in range(height)] for _ in range(width)]
 
 
@@ -100,6 +107,15 @@ SHIP_SYMBOLS = {
 }
 
 
+def load_game_tables(fleet):
+    """Load placement tables of the map size and fleet from cache (built once), sparse tiled maps skip them.
+    Args:
+        fleet (dict): A dictionary containing fleet information.
+    """
+    if len(map_cpu) * len(map_cpu[0]) < board.TILED_MIN_CELLS:
+        table_cache.load_tables(len(map_cpu), len(map_cpu[0]), fleet)
+
+
 def game_adjust(fleet):
     """Adjust game settings, including the map and Battle Ships Fleet.
     Args:
@@ -124,12 +140,14 @@ def game_adjust(fleet):
                     elif choice == 3:
                         add_new_ship(fleet)
                     elif choice == 4:
+                        load_game_tables(fleet)
                         return False
                     else:
                         print("Invalid choice.")
                 else:
                     print("Please enter a valid choice (1/2/3/4).")
             elif changes in ["N", "NO", ""]:
+                load_game_tables(fleet)
                 return False
         except KeyboardInterrupt:
             print("Game adjustment interrupted.")
@@ -334,25 +352,8 @@ def search_map_for_pattern(map, width, height):
     Returns:
     List[Tuple[int, int]]: A list of coordinate tuples (row, col) where the pattern is found.
     """
-    # Get the default symbol from the global constant
-    symbol = DEFAULT_SYMBOL
-    # Get the dimensions of the map
-    map_height, map_width = len(map), len(map[0])
-    # Initialize an empty list to store the coordinates where the pattern matches
-    coordinates = []
-    # Create the pattern using list comprehension
-    pattern = [[symbol] * width for _ in range(height)]
-    # Loop through the map to search for the pattern
-    for row in range(map_height - height + 1):
-        for col in range(map_width - width + 1):
-            # Check if the pattern matches at the current coordinates
-            if all(
-                map[row + i][col + j] == pattern[i][j]
-                for i in range(height)
-                for j in range(width)
-            ):
-                # If the pattern matches, add the coordinates to the list
-                coordinates.append([row, col])
+    # Every window is tested in O(1), using board bitmasks or summed-area table of touched cells
+    coordinates = map_search.find_pattern(map, height, width, DEFAULT_SYMBOL)
     # Return "noneFound" if no matching coordinates were found
     if not coordinates:
         return "noneFound"
@@ -374,20 +375,12 @@ def cpu_deploy_all_ships():
     # made for map size or fleet
     fleet_cpu = copy.deepcopy(DEFAULT_FLEET)
     for ship_name, ship_info in fleet_cpu.items():
-        quantity = ship_info["Quantity"]
-        size = ship_info["Size"]
-        print(f"Deploying {quantity} {ship_name}(s) of size {size}")
-        for i in range(quantity):
-            if size == 1:
-                alignment = "Single"
-            else:
-                alignment = random.choice(["Horizontal", "Vertical"])  # Horizontal or vertical
-            if alignment == "Horizontal":
-                location = random.choice(search_map_for_pattern(map_cpu, size, 1))
-            elif alignment == "Vertical":
-                location = random.choice(search_map_for_pattern(map_cpu, 1, size))
-            print(alignment)
-            map_map_show_ship_or_symbols(map_cpu, size, location, alignment, ship_name, fleet_cpu)
+        print(f"Deploying {ship_info['Quantity']} {ship_name}(s) of size {ship_info['Size']}")
+    # Uniformly random layout of the whole fleet, ValueError is raised if the fleet does not fit
+    placements = layout_sampler.sample_layout(len(map_cpu), len(map_cpu[0]), fleet_cpu)
+    for ship_name, row, column, alignment in placements:
+        print(alignment)
+        map_map_show_ship_or_symbols(map_cpu, fleet_cpu[ship_name]["Size"], [row, column], alignment, ship_name, fleet_cpu)
 
 
 def player_deploy_all_ships():
@@ -454,23 +447,6 @@ def find_biggest_ship_in_fleet(fleet):
     return biggest_ship, biggest_ship_size
 
 
-def remove_coordinates_from_list(A, B):
-    """
-    Remove coordinates from list A if they are also present in list B.
-    This function will be used to check, if there was previously made shot to those coordinates. will be needed for CPU and Player
-    Args:
-        A (List[List[int]]): The first nested list of coordinates.
-        B (List[List[int]]): The second nested list of coordinates.
-    Returns:
-        List[List[int]]: List A with coordinates removed if they are present in list B.
-    """
-    # Create a set of coordinates from list B for faster lookup
-    coordinates_set_B = set(tuple(coord) for coord in B)
-    # Filter list A to keep only coordinates not present in list B
-    filtered_A = [coord for coord in A if tuple(coord) not in coordinates_set_B]
-    return filtered_A
-
-
 def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search):
     """
     Choose shooting coordinates for the CPU based on the biggest ship in the fleet.
@@ -489,7 +465,7 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
         height = ship_size * 2 - 1
         while True:
             coordinates = search_map_for_pattern(map_to_search, width, height) # getting list of possible coordinates
-            checked_coordinates = remove_coordinates_from_list(coordinates, cpu_shoot_coordinates_log) # removing any coordinates from coordinates list, if they were previously used
+            checked_coordinates = cpu_shoot_coordinates_log.unshot(coordinates) # removing any coordinates from coordinates list, if they were previously used
             if checked_coordinates: # if there is any coordinates in list, we will choose one random
                 chosen_coordinates = random.choice(checked_coordinates) # choosing coordinates using random
                 break
@@ -499,7 +475,7 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
                     width = width - 1
                     height = height
                     coordinates = search_map_for_pattern(map_to_search, width, height) # getting list of possible coordinates
-                    checked_coordinates = remove_coordinates_from_list(coordinates, cpu_shoot_coordinates_log) # removing any coordinates from coordinates list, if they were previously used
+                    checked_coordinates = cpu_shoot_coordinates_log.unshot(coordinates) # removing any coordinates from coordinates list, if they were previously used
                     if checked_coordinates: # if there is any coordinates in list, we will choose one random
                         chosen_coordinates = random.choice(checked_coordinates) # choosing coordinates using random
                         break
@@ -507,7 +483,7 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
                         width = width + 1
                         height = height - 1
                         coordinates = search_map_for_pattern(map_to_search, width, height) # getting list of possible coordinates
-                        checked_coordinates = remove_coordinates_from_list(coordinates, cpu_shoot_coordinates_log) # removing any coordinates from coordinates list, if they were previously used
+                        checked_coordinates = cpu_shoot_coordinates_log.unshot(coordinates) # removing any coordinates from coordinates list, if they were previously used
                         if checked_coordinates: # if there is any coordinates in list, we will choose one random
                             chosen_coordinates = random.choice(checked_coordinates) # choosing coordinates using random
                             break
@@ -518,7 +494,7 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
                     width = width
                     height = height - 1
                     coordinates = search_map_for_pattern(map_to_search, width, height) # getting list of possible coordinates
-                    checked_coordinates = remove_coordinates_from_list(coordinates, cpu_shoot_coordinates_log) # removing any coordinates from coordinates list, if they were previously used
+                    checked_coordinates = cpu_shoot_coordinates_log.unshot(coordinates) # removing any coordinates from coordinates list, if they were previously used
                     if checked_coordinates: # if there is any coordinates in list, we will choose one random
                         chosen_coordinates = random.choice(checked_coordinates) # choosing coordinates using random
                         break
@@ -526,7 +502,7 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
                         width = width -1
                         height = height + 1
                         coordinates = search_map_for_pattern(map_to_search, width, height) # getting list of possible coordinates
-                        checked_coordinates = remove_coordinates_from_list(coordinates, cpu_shoot_coordinates_log) # removing any coordinates from coordinates list, if they were previously used
+                        checked_coordinates = cpu_shoot_coordinates_log.unshot(coordinates) # removing any coordinates from coordinates list, if they were previously used
                         if checked_coordinates: # if there is any coordinates in list, we will choose one random
                             chosen_coordinates = random.choice(checked_coordinates) # choosing coordinates using random
                             break
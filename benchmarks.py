@@ -0,0 +1,271 @@
+# battleship benchmarks.py - micro-benchmarks of board and CPU hot paths
+# Usage example: python benchmarks.py --save benchmark_baseline.json
+#                python benchmarks.py --compare benchmark_baseline.json
+
+import argparse  # library to read command line arguments
+import contextlib  # library to silence printing of game functions
+import copy  # library to copy game state between samples
+import json  # library to write and read baseline file
+import os  # library to find null device
+import random  # library to generate random
+import time  # library to measure timings
+
+import fleet_model  # fleet dictionary with index of ship cells
+import game_state  # game state copies with undo
+import shot_index  # index of CPU shots and unsunk hits
+import game_loader  # loads CPU vs CPU game code by path
+
+game = game_loader.load_game()  # CPU vs CPU game code (test.py)
+
+MAP_SIZES = [10, 50, 200]  # square maps, width and height
+FLEET_DENSITIES = [0.1, 0.3]  # part of map cells covered by ships
+SHOT_DENSITY = 0.2  # part of map cells already shot, so boards are in the middle of a game
+TIME_BUDGET = 0.5  # seconds of measured time per benchmark
+MAX_SAMPLES = 500  # samples per benchmark, if time budget allows
+MIN_SAMPLES = 5  # samples per benchmark, even when time budget is exceeded
+
+
+def build_state(size, fleet_density, seed):
+    """
+    Build a seeded game state in the middle of a game.
+
+    DEFAULT_FLEET is repeated until ships cover about fleet_density of the map,
+    then SHOT_DENSITY of map cells are shot with action_perform_shoot.
+
+    Args:
+        size (int): Width and height of the map.
+        fleet_density (float): Part of map cells covered by ships.
+        seed (int): Seed of random.
+
+    Returns:
+        dict: Game state with "fleet", "map_display", "map_hidden", "shots" (shot cells), "hits" (unsunk hit cells)
+              and "ship_cells" (cells of ships still afloat, not hit yet).
+    """
+    generator = random.Random(seed)
+    random.seed(seed)  # game functions use module random
+    game.MAP_HEIGHT = game.MAP_WIDTH = size
+    fleet_cells = sum(ship["Size"] * ship["Quantity"] for ship in game.DEFAULT_FLEET.values())
+    repeats = max(1, round(fleet_density * size * size / fleet_cells))
+    fleet = fleet_model.IndexedFleet.from_fleet(game.DEFAULT_FLEET)
+    map_display = game.initialize_maps(size, size, game.DEFAULT_SYMBOL)
+
+    # deploying ships at random free places, ships which do not fit after many tries are dropped
+    for ship_name, ship_info in fleet.items():
+        deployed = 0
+        for _ in range(ship_info["Quantity"] * repeats):
+            length = ship_info["Size"]
+            for _ in range(1000):
+                alignment = "Single" if length == 1 else generator.choice(["Horizontal", "Vertical"])
+                height, width = (length, 1) if alignment == "Vertical" else (1, length)
+                row = generator.randrange(size - height + 1)
+                column = generator.randrange(size - width + 1)
+                if all(map_display[row + i][column + j] == game.DEFAULT_SYMBOL
+                       for i in range(height) for j in range(width)):
+                    game.map_show_ship_or_symbols(map_display, length, [row, column], alignment, ship_name, fleet)
+                    deployed += 1
+                    break
+        fleet.set_quantity(ship_name, deployed)
+
+    # shooting part of the map
+    map_hidden = game.initialize_board(size, size, game.DEFAULT_SYMBOL)
+    game.cpu_shot_log_tmp = shot_index.ShotIndex(height=size, width=size)
+    cells = [[row, column] for row in range(size) for column in range(size)]
+    shots = generator.sample(cells, int(SHOT_DENSITY * size * size))
+    for row, column in shots:
+        game.action_perform_shoot("CPU", row, column, map_hidden, map_display, fleet)
+    ship_cells = [list(cell) for cell in fleet.cell_index if map_hidden[cell[0]][cell[1]] == game.DEFAULT_SYMBOL]
+    return {
+        "fleet": fleet,
+        "map_display": map_display,
+        "map_hidden": map_hidden,
+        "hits": game.cpu_shot_log_tmp.hit_list(),
+        "shots": shots,
+        "ship_cells": ship_cells,
+    }
+
+
+def measure(function, setup=None, inner=1, max_samples=MAX_SAMPLES):
+    """
+    Measure timings of a function call.
+
+    Args:
+        function (callable): Function to measure, called with arguments returned by setup.
+        setup (callable): Function preparing arguments of every sample, not measured. Default is None.
+        inner (int): Number of calls per sample, for very fast functions. Default is 1.
+        max_samples (int): Maximum number of samples. Default is MAX_SAMPLES.
+
+    Returns:
+        dict: "ops_per_sec", "p50_ns", "p99_ns" and "samples".
+    """
+    timings = []
+    measured = 0
+    while len(timings) < max_samples and (measured < TIME_BUDGET * 1e9 or len(timings) < MIN_SAMPLES):
+        arguments = setup() if setup else ()
+        start = time.perf_counter_ns()
+        for _ in range(inner):
+            function(*arguments)
+        elapsed = time.perf_counter_ns() - start
+        measured += elapsed
+        timings.append(elapsed / inner)
+    timings.sort()
+    return {
+        "ops_per_sec": round(len(timings) * 1e9 / sum(timings), 2),
+        "p50_ns": round(timings[len(timings) // 2]),
+        "p99_ns": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))]),
+        "samples": len(timings),
+    }
+
+
+def maps_equal(first_map, second_map):
+    """Check if two maps (list maps or boards) hold the same symbols in every cell."""
+    return len(first_map) == len(second_map) and all(list(first_row) == list(second_row)
+                                                     for first_row, second_row in zip(first_map, second_map))
+
+
+def benchmark_state(state, seed):
+    """
+    Run every hot path benchmark on a game state.
+
+    Args:
+        state (dict): Game state built by build_state.
+        seed (int): Seed of random.
+
+    Returns:
+        dict: Benchmark name -> timings returned by measure.
+    """
+    generator = random.Random(seed)
+    map_hidden = state["map_hidden"]
+    map_list = map_hidden.to_map()  # same map as 2D list
+    size = len(map_list)
+    targets = [[generator.randrange(size), generator.randrange(size)] for _ in range(256)]
+    results = {}
+
+    results["search_map_for_pattern[list]"] = measure(lambda: game.search_map_for_pattern(map_list, 3, 3))
+
+    # boards memoize searches, so cold (memo cleared), one cell changed since the last search and warm are timed apart
+    def clear_pattern_cache():
+        """Forget memoized searches of the board, boards without a memo have nothing to clear."""
+        if hasattr(map_hidden, "_pattern_cache"):
+            map_hidden._pattern_cache.clear()
+        return ()
+
+    miss_symbol = game.SHIP_SYMBOLS["Miss"][0]
+    change_cycle = iter(targets * (MAX_SAMPLES * 10))
+    missed_cells = []  # (row, column, symbol before the miss) of the cell missed by change_one_cell
+
+    def change_one_cell():
+        """Miss a cell, or put back the cell missed before, so every search sees exactly one changed cell."""
+        if missed_cells:
+            row, column, symbol = missed_cells.pop()
+        else:
+            row, column = next(change_cycle)
+            missed_cells.append((row, column, map_hidden[row][column]))
+            symbol = miss_symbol
+        map_hidden[row][column] = symbol
+        return ()
+
+    def search_board():
+        return game.search_map_for_pattern(map_hidden, 3, 3)
+
+    results["search_map_for_pattern[board,cold]"] = measure(search_board, setup=clear_pattern_cache)
+    results["search_map_for_pattern[board,changed]"] = measure(search_board, setup=change_one_cell)
+    if missed_cells:
+        change_one_cell()
+    results["search_map_for_pattern[board,warm]"] = measure(search_board)
+
+    target_cycle = iter(targets * (MAX_SAMPLES * 10))
+    results["find_ship_and_coordinates"] = measure(
+        lambda: game.find_ship_and_coordinates(state["fleet"], next(target_cycle)), inner=10)
+
+    # damaged ship in CPU log, or any ship cell when there are no unsunk hits
+    game.cpu_shot_log_tmp = shot_index.ShotIndex(state["shots"], state["hits"][:4] or state["ship_cells"][:1], size, size)
+    results["select_best_shot_based_on_alignment"] = measure(
+        lambda: game.select_best_shot_based_on_alignment(map_hidden, state["fleet"]))
+
+    def check_damage_setup():
+        # fresh copy of the state, so every sample hits a ship cell that was not hit yet
+        fleet, map_display, hidden = copy.deepcopy((state["fleet"], state["map_display"], map_hidden))
+        return "Human", fleet, generator.choice(state["ship_cells"]), map_display, hidden
+
+    if state["ship_cells"]:
+        # copying the state is slow on big maps, so fewer samples are taken
+        results["check_ship_damage"] = measure(game.check_ship_damage, setup=check_damage_setup, max_samples=100)
+
+    # hypothetical shot and its undo, as done by lookahead search
+    lookahead = game_state.GameState.capture(map_hidden, state["map_display"], state["fleet"], game.SHIP_SYMBOLS,
+                                             state["hits"])
+    shots = iter((state["ship_cells"] + targets) * (MAX_SAMPLES * 10))
+
+    def shoot_and_undo():
+        lookahead.shoot("CPU", *next(shots))
+        lookahead.undo()
+
+    # regression check: shots on the captured state, and their undo, never touch the live maps
+    live_maps = ([list(map_row) for map_row in map_hidden], [list(map_row) for map_row in state["map_display"]])
+    for row, column in state["ship_cells"][:3] + targets[:3]:
+        lookahead.shoot("CPU", row, column)
+    shot_maps_equal = maps_equal(live_maps[0], map_hidden) and maps_equal(live_maps[1], state["map_display"])
+    while lookahead.undo():
+        pass
+    results["game_state_shoot_undo"] = measure(shoot_and_undo, inner=10)
+    if not (shot_maps_equal and maps_equal(live_maps[0], map_hidden) and maps_equal(live_maps[1], state["map_display"])):
+        raise RuntimeError("shots on a captured GameState changed the live maps")
+
+    results["print_two_maps"] = measure(
+        lambda: game.print_two_maps(map_hidden, state["map_display"], "hidden_cpu_map", "cpu_map"))
+    return results
+
+
+def run_benchmarks(seed):
+    """
+    Run benchmarks on every map size and fleet density.
+
+    Args:
+        seed (int): Seed of random.
+
+    Returns:
+        dict: "size x size @ density / benchmark name" -> timings.
+    """
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for size in MAP_SIZES:
+            for fleet_density in FLEET_DENSITIES:
+                state = build_state(size, fleet_density, seed)
+                for name, timings in benchmark_state(state, seed).items():
+                    results[f"{size}x{size}@{fleet_density}/{name}"] = timings
+    return results
+
+
+def print_results(results, baseline=None):
+    """Print benchmark results table, with speed change against baseline if it is given."""
+    print("{:<60} {:>14} {:>12} {:>12} {:>10}".format("Benchmark", "ops/sec", "p50 us", "p99 us", "change"))
+    print("=" * 112)
+    for name, timings in results.items():
+        change = ""
+        if baseline and name in baseline:
+            change = f"{timings['ops_per_sec'] / baseline[name]['ops_per_sec']:.2f}x"
+        print("{:<60} {:>14.1f} {:>12.1f} {:>12.1f} {:>10}".format(
+            name, timings["ops_per_sec"], timings["p50_ns"] / 1000, timings["p99_ns"] / 1000, change))
+
+
+def main():
+    """Read command line arguments, run benchmarks, save or compare results."""
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of battleship board and CPU hot paths.")
+    parser.add_argument("--seed", type=int, default=0, help="seed of board states")
+    parser.add_argument("--save", help="save results to this baseline file (JSON)")
+    parser.add_argument("--compare", help="compare results with this baseline file (JSON)")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.seed)
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+    print_results(results, baseline)
+    if arguments.save:
+        with open(arguments.save, "w") as baseline_file:
+            json.dump({"seed": arguments.seed, "results": results}, baseline_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,815 @@
+# battleship board.py - game map stored as bitmasks, with the same row/column indexing as list maps
+
+import map_search  # vectorized window search and optional NumPy import
+
+# Names of bitmask layers kept by every board
+BOARD_LAYERS = ("ships", "shots", "hits", "sunk")
+
+# Cell states of PaddedBoard
+FREE = 0  # not shot yet
+SHOT = 1  # missed, or ship cell of a sunk ship
+HIT = 2  # hit on a ship not sunk yet
+BORDER = 3  # sentinel cell around the map
+
+_neighbour_offsets = {}  # map width -> neighbour offsets of PaddedBoard, see neighbour_offsets
+
+CHUNK_SIZE = 64  # rows and columns of TiledBoard chunks
+TILED_MIN_CELLS = 1 << 20  # maps with so many cells use TiledBoard, see make_board
+
+# Bit flags of ArrayBoard cells, one per layer, plus flag for cells not holding default symbol
+TOUCHED_FLAG = 1
+LAYER_FLAGS = {"ships": 2, "shots": 4, "hits": 8, "sunk": 16}
+
+
+def symbol_layers_from_ship_symbols(ship_symbols):
+    """Build a dictionary telling which board layers every ship symbol belongs to.
+
+    Args:
+        ship_symbols (dict): Dictionary of ship symbols, like SHIP_SYMBOLS.
+
+    Returns:
+        dict: Dictionary symbol -> tuple of layer names.
+    """
+    symbol_layers = {}
+    for symbol_name, symbols in ship_symbols.items():
+        if symbol_name == "Hit":
+            layers = ("shots", "hits")
+        elif symbol_name == "Miss":
+            layers = ("shots",)
+        elif symbol_name.endswith("Sunk"):
+            layers = ("ships", "shots", "hits", "sunk")
+        else:
+            layers = ("ships",)
+        for symbol in symbols:
+            # some symbol dictionaries keep every symbol in its own list
+            if isinstance(symbol, list):
+                for nested_symbol in symbol:
+                    symbol_layers[nested_symbol] = layers
+            else:
+                symbol_layers[symbol] = layers
+    return symbol_layers
+
+
+def window_starts(free, height, width, row_width):
+    """
+    Return bitmask of cells starting a height x width window of free cells, edges are not checked.
+
+    Args:
+        free (int): Bitmask of free cells, cell [row, column] is bit row * row_width + column.
+        height (int): Height of the window.
+        width (int): Width of the window.
+        row_width (int): Number of cells in a row of the bitmask.
+    """
+    # cells starting a horizontal run of width free cells
+    run = free
+    for i in range(1, width):
+        run &= free >> i
+    # cells starting height such runs stacked on top of each other
+    starts = run
+    for i in range(1, height):
+        starts &= run >> (i * row_width)
+    return starts
+
+
+class BoardRow:
+    """Single row of a Board, so cells can be used as board[row][column]."""
+    __slots__ = ("board", "row")
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.width
+
+    def __getitem__(self, column):
+        if column < 0:
+            column += self.board.width
+        return self.board.get_cell(self.row, column)
+
+    def __setitem__(self, column, value):
+        if column < 0:
+            column += self.board.width
+        self.board.set_cell(self.row, column, value)
+
+    def __iter__(self):
+        for column in range(self.board.width):
+            yield self.board.get_cell(self.row, column)
+
+
+class Board:
+    """
+    Game map backed by arbitrary-precision int bitmasks.
+
+    Cell [row, column] is bit number row * width + column. Board keeps one bitmask layer each for
+    ships, shots, hits and sunk cells, plus a "touched" bitmask of cells not holding default_symbol.
+    Symbols are kept only for touched cells, so board[row][column] returns the same values
+    as a list map would, and print_two_maps and deploy functions keep working.
+    """
+
+    def __init__(self, height, width, default_symbol, symbol_layers=None):
+        """
+        Args:
+            height (int): Number of rows.
+            width (int): Number of columns.
+            default_symbol (str): Symbol of untouched cells.
+            symbol_layers (dict): Dictionary symbol -> tuple of layer names, used when symbols are
+                written to cells. Default is None, only touched cells are tracked then.
+        """
+        self.height = height
+        self.width = width
+        self.default_symbol = default_symbol
+        self.symbol_layers = symbol_layers if symbol_layers is not None else {}
+        self.full_mask = (1 << (height * width)) - 1  # all cells of the board
+        self.touched = 0  # cells not holding default_symbol
+        self.ships = 0
+        self.shots = 0
+        self.hits = 0
+        self.sunk = 0
+        self.symbols = {}  # cell index -> symbol, only for touched cells
+        self._start_masks = {}  # (height, width) -> bitmask of valid top-left corners
+        self.version = 0  # increased on every cell change
+        self.changes = []  # journal of changed cell indexes, changes[version - 1] was changed last
+        self._pattern_cache = {}  # (height, width) -> [version, starts bitmask, coordinates]
+
+    @classmethod
+    def from_map(cls, game_map, default_symbol, symbol_layers=None):
+        """Create a board from a list map.
+
+        Args:
+            game_map (list): 2D list representing the game map.
+            default_symbol (str): Symbol of untouched cells.
+            symbol_layers (dict): Dictionary symbol -> tuple of layer names.
+
+        Returns:
+            Board: New board holding the same symbols as game_map.
+        """
+        board = cls(len(game_map), len(game_map[0]), default_symbol, symbol_layers)
+        for row, map_row in enumerate(game_map):
+            for column, value in enumerate(map_row):
+                if value != default_symbol:
+                    board.set_cell(row, column, value)
+        return board
+
+    def to_map(self):
+        """Return the board as a list map (2D list of symbols)."""
+        return [list(self[row]) for row in range(self.height)]
+
+    def copy(self):
+        """Return an independent copy of the board, bitmask layers are immutable ints, so only symbols are copied."""
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.symbols = dict(self.symbols)
+        board.changes = list(self.changes)
+        board._pattern_cache = dict(self._pattern_cache)  # cache entries are replaced, never changed in place
+        return board
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.height
+        if not 0 <= row < self.height:
+            raise IndexError("board row index out of range")
+        return BoardRow(self, row)
+
+    def __iter__(self):
+        for row in range(self.height):
+            yield BoardRow(self, row)
+
+    def cell_index(self, row, column):
+        """Return bit number of the cell [row, column]."""
+        if not (0 <= row < self.height and 0 <= column < self.width):
+            raise IndexError(f"cell [{row}, {column}] is out of the board")
+        return row * self.width + column
+
+    def get_cell(self, row, column):
+        """Return symbol of the cell [row, column]."""
+        return self.symbols.get(self.cell_index(row, column), self.default_symbol)
+
+    def set_cell(self, row, column, value):
+        """Write symbol to the cell [row, column] and update all bitmask layers.
+
+        Args:
+            row (int): Row of the cell.
+            column (int): Column of the cell.
+            value (str): Symbol to write.
+        """
+        index = self.cell_index(row, column)
+        if self.symbols.get(index, self.default_symbol) == value:
+            return  # nothing changes, cached searches stay valid
+        self.version += 1
+        self.changes.append(index)
+        bit = 1 << index
+        # clearing cell from every layer, then setting layers of new symbol
+        self.touched &= ~bit
+        for layer in BOARD_LAYERS:
+            setattr(self, layer, getattr(self, layer) & ~bit)
+        if value == self.default_symbol:
+            self.symbols.pop(index, None)
+            return
+        self.symbols[index] = value
+        self.touched |= bit
+        for layer in self.symbol_layers.get(value, ()):
+            setattr(self, layer, getattr(self, layer) | bit)
+
+    def cells_mask(self, coordinates_list):
+        """Return bitmask of a list of [row, column] coordinates, like a ship coordinates list."""
+        mask = 0
+        for row, column in coordinates_list:
+            mask |= 1 << self.cell_index(row, column)
+        return mask
+
+    def placement_mask(self, row, column, length, alignment):
+        """
+        Return bitmask of cells a ship would cover, or None if it does not fit inside the board.
+
+        Args:
+            row (int): Starting row of the ship.
+            column (int): Starting column of the ship.
+            length (int): Length of the ship.
+            alignment (str): "Horizontal", "Vertical" or "Single".
+
+        Returns:
+            int: Bitmask of ship cells, None if ship is out of the board.
+        """
+        if alignment == "Vertical":
+            height, width = length, 1
+        else:
+            height, width = 1, length
+        if row < 0 or column < 0 or row + height > self.height or column + width > self.width:
+            return None
+        return self.window_mask(row, column, height, width)
+
+    def can_place(self, row, column, length, alignment):
+        """Check if a ship fits on untouched cells of the board."""
+        mask = self.placement_mask(row, column, length, alignment)
+        return mask is not None and not mask & self.touched
+
+    def is_sunk(self, ship_mask):
+        """Check if every cell of a ship bitmask was hit."""
+        return self.hits & ship_mask == ship_mask
+
+    def window_mask(self, row, column, height, width):
+        """Return bitmask of a height x width window with top-left corner at [row, column]."""
+        row_bits = (1 << width) - 1
+        mask = 0
+        for i in range(height):
+            mask |= row_bits << (i * self.width)
+        return mask << (row * self.width + column)
+
+    def _start_mask(self, height, width):
+        """Return bitmask of all top-left corners where a height x width window fits the board."""
+        key = (height, width)
+        if key not in self._start_masks:
+            self._start_masks[key] = self.window_mask(0, 0, self.height - height + 1, self.width - width + 1)
+        return self._start_masks[key]
+
+    def dirty_since(self, version):
+        """
+        Return rectangle of cells changed after the given board version.
+
+        Args:
+            version (int): Board version to compare with.
+
+        Returns:
+            tuple: (top, left, bottom, right) inclusive rows and columns, None if nothing changed.
+        """
+        changed = self.changes[version:]
+        if not changed:
+            return None
+        rows = [index // self.width for index in changed]
+        columns = [index % self.width for index in changed]
+        return min(rows), min(columns), max(rows), max(columns)
+
+    def _window_starts(self, free, height, width):
+        """Return bitmask of cells starting a height x width window of free cells (edges not checked)."""
+        return window_starts(free, height, width, self.width)
+
+    def _starts_to_coordinates(self, starts):
+        """Convert bitmask of top-left corners to list of [row, col], row by row."""
+        coordinates = []
+        bits = format(starts, "b")[::-1]  # lowest bit first
+        index = bits.find("1")
+        while index != -1:
+            coordinates.append([index // self.width, index % self.width])
+            index = bits.find("1", index + 1)
+        return coordinates
+
+    def search_pattern(self, height, width):
+        """
+        Find all top-left coordinates of height x width windows made only of untouched cells.
+
+        Uses shifts and ANDs of the untouched cells bitmask, coordinates are returned
+        row by row, same as search_map_for_pattern does on list maps.
+        Results are memoized per (height, width) and board version. When the board has changed,
+        only windows overlapping the changed cells are evaluated again.
+
+        Args:
+            height (int): Height of the pattern to search for.
+            width (int): Width of the pattern to search for.
+
+        Returns:
+            list: A list of coordinates [row, col], empty list if the pattern was not found.
+        """
+        rows = range(self.height - height + 1)
+        columns = range(self.width - width + 1)
+        # empty pattern matches everywhere, same as the cell by cell search
+        if height <= 0 or width <= 0:
+            return [[row, col] for row in rows for col in columns]
+        if height > self.height or width > self.width:
+            return []
+
+        cached = self._pattern_cache.get((height, width))
+        if cached is not None and cached[0] == self.version:
+            return list(cached[2])
+
+        free = self.full_mask & ~self.touched
+        if cached is None:
+            starts = self._window_starts(free, height, width) & self._start_mask(height, width)
+        else:
+            # only windows overlapping the dirty rectangle can change
+            top, left, bottom, right = self.dirty_since(cached[0])
+            first_row, last_row = max(0, top - height + 1), min(bottom, self.height - height)
+            first_column, last_column = max(0, left - width + 1), min(right, self.width - width)
+            region = self.window_mask(first_row, first_column, last_row - first_row + 1,
+                                      last_column - first_column + 1)
+            # searching band of rows covering every window of the region
+            band_rows = last_row - first_row + height
+            band_free = (free >> (first_row * self.width)) & ((1 << (band_rows * self.width)) - 1)
+            band_starts = self._window_starts(band_free, height, width) << (first_row * self.width)
+            starts = (cached[1] & ~region) | (band_starts & region)
+
+        coordinates = self._starts_to_coordinates(starts)
+        self._pattern_cache[(height, width)] = [self.version, starts, coordinates]
+        return list(coordinates)
+
+
+class ArrayBoard:
+    """
+    Game map backed by NumPy small-int array, for big maps. Needs NumPy installed.
+
+    Every cell is uint8 holding TOUCHED_FLAG and LAYER_FLAGS of its symbol, so whole board layers
+    and window searches are vectorized. Symbols are kept only for touched cells, board[row][column]
+    returns the same values as a list map would. Changed cells are journaled like on Board.
+    """
+
+    def __init__(self, height, width, default_symbol, symbol_layers=None):
+        """
+        Args:
+            height (int): Number of rows.
+            width (int): Number of columns.
+            default_symbol (str): Symbol of untouched cells.
+            symbol_layers (dict): Dictionary symbol -> tuple of layer names. Default is None.
+        """
+        if map_search.np is None:
+            raise ImportError("ArrayBoard needs NumPy, use Board instead")
+        self.height = height
+        self.width = width
+        self.default_symbol = default_symbol
+        self.symbol_layers = symbol_layers if symbol_layers is not None else {}
+        self.cells = map_search.np.zeros((height, width), dtype=map_search.np.uint8)
+        self.symbols = {}  # (row, column) -> symbol, only for touched cells
+        self.version = 0  # increased on every cell change
+        self.changes = []  # journal of changed cell indexes (row * width + column)
+
+    @classmethod
+    def from_map(cls, game_map, default_symbol, symbol_layers=None):
+        """Create an array board from a list map.
+
+        Args:
+            game_map (list): 2D list representing the game map.
+            default_symbol (str): Symbol of untouched cells.
+            symbol_layers (dict): Dictionary symbol -> tuple of layer names.
+
+        Returns:
+            ArrayBoard: New board holding the same symbols as game_map.
+        """
+        board = cls(len(game_map), len(game_map[0]), default_symbol, symbol_layers)
+        for row, map_row in enumerate(game_map):
+            for column, value in enumerate(map_row):
+                if value != default_symbol:
+                    board.set_cell(row, column, value)
+        return board
+
+    def to_map(self):
+        """Return the board as a list map (2D list of symbols)."""
+        return [list(self[row]) for row in range(self.height)]
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        board = ArrayBoard.__new__(ArrayBoard)
+        board.__dict__.update(self.__dict__)
+        board.cells = self.cells.copy()
+        board.symbols = dict(self.symbols)
+        board.changes = list(self.changes)
+        return board
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.height
+        if not 0 <= row < self.height:
+            raise IndexError("board row index out of range")
+        return BoardRow(self, row)
+
+    def __iter__(self):
+        for row in range(self.height):
+            yield BoardRow(self, row)
+
+    def _check_cell(self, row, column):
+        """Raise IndexError if the cell is out of the board, NumPy would wrap negative indexes."""
+        if not (0 <= row < self.height and 0 <= column < self.width):
+            raise IndexError(f"cell [{row}, {column}] is out of the board")
+
+    def get_cell(self, row, column):
+        """Return symbol of the cell [row, column]."""
+        self._check_cell(row, column)
+        return self.symbols.get((row, column), self.default_symbol)
+
+    def set_cell(self, row, column, value):
+        """Write symbol to the cell [row, column] and update its layer flags.
+
+        Args:
+            row (int): Row of the cell.
+            column (int): Column of the cell.
+            value (str): Symbol to write.
+        """
+        self._check_cell(row, column)
+        if self.symbols.get((row, column), self.default_symbol) == value:
+            return
+        self.version += 1
+        self.changes.append(row * self.width + column)
+        if value == self.default_symbol:
+            self.symbols.pop((row, column), None)
+            self.cells[row, column] = 0
+            return
+        self.symbols[(row, column)] = value
+        flags = TOUCHED_FLAG
+        for layer in self.symbol_layers.get(value, ()):
+            flags |= LAYER_FLAGS[layer]
+        self.cells[row, column] = flags
+
+    def layer(self, name):
+        """Return boolean array of the cells belonging to a layer ("ships", "shots", "hits" or "sunk")."""
+        return (self.cells & LAYER_FLAGS[name]) != 0
+
+    def can_place(self, row, column, length, alignment):
+        """Check if a ship fits on untouched cells of the board."""
+        if alignment == "Vertical":
+            height, width = length, 1
+        else:
+            height, width = 1, length
+        if row < 0 or column < 0 or row + height > self.height or column + width > self.width:
+            return False
+        return not (self.cells[row:row + height, column:column + width] & TOUCHED_FLAG).any()
+
+    def is_sunk(self, coordinates_list):
+        """Check if every cell of a ship coordinates list was hit."""
+        rows, columns = zip(*coordinates_list)
+        return bool((self.cells[list(rows), list(columns)] & LAYER_FLAGS["hits"]).all())
+
+    def search_pattern(self, height, width):
+        """
+        Find all top-left coordinates of height x width windows made only of untouched cells.
+
+        Args:
+            height (int): Height of the pattern to search for.
+            width (int): Width of the pattern to search for.
+
+        Returns:
+            list: A list of coordinates [row, col], empty list if the pattern was not found.
+        """
+        return map_search.search_array_for_pattern(self.cells & TOUCHED_FLAG, height, width)
+
+
+class TiledBoard:
+    """
+    Sparse game map for very large maps, split into CHUNK_SIZE x CHUNK_SIZE chunks.
+
+    Every chunk is a Board, it is allocated on the first write of a symbol other than default_symbol
+    and dropped when all its cells hold default_symbol again, so memory grows with ships and shots,
+    not with map area. board[row][column] returns the same values as a list map would.
+    Pattern search takes windows of chunks without touched cells at once.
+    """
+
+    def __init__(self, height, width, default_symbol, symbol_layers=None):
+        """
+        Args:
+            height (int): Number of rows.
+            width (int): Number of columns.
+            default_symbol (str): Symbol of untouched cells.
+            symbol_layers (dict): Dictionary symbol -> tuple of layer names. Default is None.
+        """
+        self.height = height
+        self.width = width
+        self.default_symbol = default_symbol
+        self.symbol_layers = symbol_layers
+        self.chunks = {}  # (chunk row, chunk column) -> Board, only chunks with touched cells
+        self.shared = set()  # keys of chunks shared with copies of the board, copied before they are changed
+        self.version = 0  # increased on every cell change
+        self.changes = []  # journal of changed cell indexes (row * width + column), like Board
+        self._pattern_cache = {}  # (height, width) -> [version, coordinates]
+
+    @classmethod
+    def from_map(cls, game_map, default_symbol, symbol_layers=None):
+        """Create a tiled board from a list map, see Board.from_map."""
+        board = cls(len(game_map), len(game_map[0]), default_symbol, symbol_layers)
+        for row, map_row in enumerate(game_map):
+            for column, value in enumerate(map_row):
+                if value != default_symbol:
+                    board.set_cell(row, column, value)
+        return board
+
+    def to_map(self):
+        """Return the board as a list map (2D list of symbols), only for maps small enough to be listed."""
+        return [list(self[row]) for row in range(self.height)]
+
+    def copy(self):
+        """
+        Return a copy of the board which shares chunks with this board, a shared chunk is copied
+        by the board writing to it first (copy on write), so copying costs nothing per cell.
+        """
+        board = TiledBoard.__new__(TiledBoard)
+        board.__dict__.update(self.__dict__)
+        board.chunks = dict(self.chunks)
+        self.shared = set(self.chunks)
+        board.shared = set(self.chunks)
+        board.changes = list(self.changes)
+        board._pattern_cache = dict(self._pattern_cache)
+        return board
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.height
+        if not 0 <= row < self.height:
+            raise IndexError("board row index out of range")
+        return BoardRow(self, row)
+
+    def __iter__(self):
+        for row in range(self.height):
+            yield BoardRow(self, row)
+
+    def cell_index(self, row, column):
+        """Return index of the cell [row, column], row * width + column."""
+        if not (0 <= row < self.height and 0 <= column < self.width):
+            raise IndexError(f"cell [{row}, {column}] is out of the board")
+        return row * self.width + column
+
+    def get_cell(self, row, column):
+        """Return symbol of the cell [row, column]."""
+        self.cell_index(row, column)
+        chunk = self.chunks.get((row // CHUNK_SIZE, column // CHUNK_SIZE))
+        if chunk is None:
+            return self.default_symbol
+        return chunk.get_cell(row % CHUNK_SIZE, column % CHUNK_SIZE)
+
+    def set_cell(self, row, column, value):
+        """Write symbol to the cell [row, column], allocating or dropping its chunk when needed."""
+        index = self.cell_index(row, column)
+        key = (row // CHUNK_SIZE, column // CHUNK_SIZE)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if value == self.default_symbol:
+                return
+            chunk = self.chunks[key] = Board(min(CHUNK_SIZE, self.height - key[0] * CHUNK_SIZE),
+                                             min(CHUNK_SIZE, self.width - key[1] * CHUNK_SIZE),
+                                             self.default_symbol, self.symbol_layers)
+        chunk_row, chunk_column = row % CHUNK_SIZE, column % CHUNK_SIZE
+        if chunk.get_cell(chunk_row, chunk_column) == value:
+            return
+        if key in self.shared:
+            chunk = self.chunks[key] = chunk.copy()
+            self.shared.discard(key)
+        chunk.set_cell(chunk_row, chunk_column, value)
+        self.version += 1
+        self.changes.append(index)
+        if not chunk.touched:
+            del self.chunks[key]
+
+    def chunk_summary(self, chunk_row, chunk_column):
+        """
+        Return number of touched, ship, shot, hit and sunk cells of a chunk.
+
+        Returns:
+            dict: "touched" and every name of BOARD_LAYERS -> number of cells.
+        """
+        chunk = self.chunks.get((chunk_row, chunk_column))
+        summary = {"touched": bin(chunk.touched).count("1") if chunk else 0}
+        for layer in BOARD_LAYERS:
+            summary[layer] = bin(getattr(chunk, layer)).count("1") if chunk else 0
+        return summary
+
+    def count(self, layer):
+        """Return number of cells of a layer ("touched" or a name of BOARD_LAYERS) on the whole board."""
+        return sum(bin(getattr(chunk, layer)).count("1") for chunk in self.chunks.values())
+
+    def _touched_region(self, top, left, height, width):
+        """Return bitmask of touched cells of a region, cell [row, column] is bit (row - top) * width + column - left."""
+        touched = 0
+        for chunk_row in range(top // CHUNK_SIZE, (top + height - 1) // CHUNK_SIZE + 1):
+            for chunk_column in range(left // CHUNK_SIZE, (left + width - 1) // CHUNK_SIZE + 1):
+                chunk = self.chunks.get((chunk_row, chunk_column))
+                if chunk is None:
+                    continue
+                chunk_top, chunk_left = chunk_row * CHUNK_SIZE, chunk_column * CHUNK_SIZE
+                first_column = max(left, chunk_left)
+                row_bits = (1 << (min(left + width, chunk_left + chunk.width) - first_column)) - 1
+                for row in range(max(top, chunk_top), min(top + height, chunk_top + chunk.height)):
+                    bits = chunk.touched >> ((row - chunk_top) * chunk.width + first_column - chunk_left) & row_bits
+                    if bits:
+                        touched |= bits << ((row - top) * width + first_column - left)
+        return touched
+
+    def _chunk_starts(self, chunk_row, chunk_column, height, width):
+        """
+        Return top-left corners of free height x width windows starting in a chunk.
+
+        Returns:
+            dict: Row -> columns (range or list) of window corners in the row, rows without corners are left out.
+        """
+        top, left = chunk_row * CHUNK_SIZE, chunk_column * CHUNK_SIZE
+        start_rows = min(CHUNK_SIZE, self.height - height + 1 - top)
+        start_columns = min(CHUNK_SIZE, self.width - width + 1 - left)
+        if start_rows <= 0 or start_columns <= 0:
+            return {}
+        region_height, region_width = start_rows + height - 1, start_columns + width - 1
+        touched = self._touched_region(top, left, region_height, region_width)
+        if not touched:
+            # no touched cells under any window, every corner of the chunk is free
+            columns = range(left, left + start_columns)
+            return {row: columns for row in range(top, top + start_rows)}
+        free = ((1 << (region_height * region_width)) - 1) & ~touched
+        starts = window_starts(free, height, width, region_width)
+        corners = {}
+        for row in range(start_rows):
+            bits = starts >> (row * region_width) & ((1 << start_columns) - 1)
+            if bits:
+                corners[top + row] = [left + column for column in range(start_columns) if bits >> column & 1]
+        return corners
+
+    def search_pattern(self, height, width):
+        """
+        Find all top-left coordinates of height x width windows made only of untouched cells,
+        row by row, same as Board.search_pattern. Results are memoized per (height, width) and board version.
+
+        Args:
+            height (int): Height of the pattern to search for.
+            width (int): Width of the pattern to search for.
+
+        Returns:
+            list: A list of coordinates [row, col], empty list if the pattern was not found.
+        """
+        if height <= 0 or width <= 0:
+            return [[row, col] for row in range(self.height - height + 1) for col in range(self.width - width + 1)]
+        if height > self.height or width > self.width:
+            return []
+        cached = self._pattern_cache.get((height, width))
+        if cached is not None and cached[0] == self.version:
+            return list(cached[1])
+
+        coordinates = []
+        chunk_columns = -(-self.width // CHUNK_SIZE)
+        for chunk_row in range(-(-self.height // CHUNK_SIZE)):
+            # corners of a band of chunks, merged row by row
+            band = [self._chunk_starts(chunk_row, chunk_column, height, width) for chunk_column in range(chunk_columns)]
+            for row in range(chunk_row * CHUNK_SIZE, min(self.height, (chunk_row + 1) * CHUNK_SIZE)):
+                for corners in band:
+                    for column in corners.get(row, ()):
+                        coordinates.append([row, column])
+        self._pattern_cache[(height, width)] = [self.version, coordinates]
+        return list(coordinates)
+
+
+def neighbour_offsets(width):
+    """
+    Return neighbour offsets of cells of a PaddedBoard of a map width, built once per width.
+
+    Returns:
+        tuple: (4 offsets of up, down, left and right neighbours, 8 offsets adding diagonal neighbours).
+    """
+    if width not in _neighbour_offsets:
+        row_width = width + 2
+        offsets_4 = (-row_width, row_width, -1, 1)
+        _neighbour_offsets[width] = (offsets_4, offsets_4 + (-row_width - 1, -row_width + 1,
+                                                            row_width - 1, row_width + 1))
+    return _neighbour_offsets[width]
+
+
+class PaddedBoard:
+    """
+    Cell states of a map in a flat bytearray with a one-cell BORDER sentinel around the map.
+
+    Cell [row, column] is index (row + 1) * (width + 2) + column + 1. Every map cell has all its
+    neighbours in the buffer, the ones outside the map hold BORDER, so neighbours are found by adding
+    offsets from offsets_4 or offsets_8, without bounds checks.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.row_width = width + 2
+        self.cells = bytearray(self.row_width * (height + 2))
+        self.offsets_4, self.offsets_8 = neighbour_offsets(width)
+        # sentinel border: first and last rows, first and last column of every row
+        self.cells[:self.row_width] = bytes([BORDER]) * self.row_width
+        self.cells[-self.row_width:] = bytes([BORDER]) * self.row_width
+        self.cells[self.row_width::self.row_width] = bytes([BORDER]) * (height + 1)
+        self.cells[self.row_width - 1::self.row_width] = bytes([BORDER]) * (height + 2)
+
+    def index(self, row, column):
+        """Return buffer index of the cell [row, column], cells one step outside of the map are BORDER."""
+        return (row + 1) * self.row_width + column + 1
+
+    def coordinates(self, index):
+        """Return [row, column] of a buffer index."""
+        row, column = divmod(index, self.row_width)
+        return [row - 1, column - 1]
+
+    def get(self, row, column):
+        """Return state of the cell [row, column]."""
+        return self.cells[(row + 1) * self.row_width + column + 1]
+
+    def set(self, row, column, state):
+        """Set state (FREE, SHOT or HIT) of the cell [row, column]."""
+        self.cells[(row + 1) * self.row_width + column + 1] = state
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        board = PaddedBoard.__new__(PaddedBoard)
+        board.__dict__.update(self.__dict__)
+        board.cells = bytearray(self.cells)
+        return board
+
+
+class _SparseCells:
+    """Cell states of SparsePaddedBoard, indexed like PaddedBoard cells, only cells which are not FREE are stored."""
+    __slots__ = ("states", "height", "row_width")
+
+    def __init__(self, height, row_width):
+        self.states = {}  # buffer index -> SHOT or HIT
+        self.height = height
+        self.row_width = row_width
+
+    def __getitem__(self, index):
+        state = self.states.get(index)
+        if state is not None:
+            return state
+        row, column = divmod(index, self.row_width)
+        if row < 1 or row > self.height or column < 1 or column > self.row_width - 2:
+            return BORDER
+        return FREE
+
+    def __setitem__(self, index, state):
+        if state == FREE:
+            self.states.pop(index, None)
+        else:
+            self.states[index] = state
+
+
+class SparsePaddedBoard(PaddedBoard):
+    """
+    PaddedBoard for very large maps, cell states are kept in a dictionary of cells which are not FREE,
+    so memory grows with shots only. Indexes, offsets and cell states are the same as of PaddedBoard,
+    cells outside of the map read as BORDER.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.row_width = width + 2
+        self.cells = _SparseCells(height, self.row_width)
+        self.offsets_4, self.offsets_8 = neighbour_offsets(width)
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        board = SparsePaddedBoard.__new__(SparsePaddedBoard)
+        board.__dict__.update(self.__dict__)
+        board.cells = _SparseCells(self.height, self.row_width)
+        board.cells.states = dict(self.cells.states)
+        return board
+
+
+def make_padded_board(height, width):
+    """Return PaddedBoard for the map, or SparsePaddedBoard when map has TILED_MIN_CELLS cells or more."""
+    if height * width >= TILED_MIN_CELLS:
+        return SparsePaddedBoard(height, width)
+    return PaddedBoard(height, width)
+
+
+def make_board(height, width, default_symbol, symbol_layers=None):
+    """
+    Return board for the map: TiledBoard when map has TILED_MIN_CELLS cells or more,
+    ArrayBoard when it has map_search.NUMPY_MIN_CELLS cells or more and NumPy is installed, otherwise Board.
+    """
+    if height * width >= TILED_MIN_CELLS:
+        return TiledBoard(height, width, default_symbol, symbol_layers)
+    if map_search.np is not None and height * width >= map_search.NUMPY_MIN_CELLS:
+        return ArrayBoard(height, width, default_symbol, symbol_layers)
+    return Board(height, width, default_symbol, symbol_layers)
@@ -0,0 +1,235 @@
+# battleship bulk_layouts.py - bulk generation of CPU fleet layouts into a memory-mapped file
+# Usage example: python bulk_layouts.py --count 1000000 --workers 8 --output layouts.bin
+#
+# File format (little-endian):
+#     header: HEADER_FORMAT fields, then fleet signature as JSON, padded to header_size bytes
+#     records: count fixed-width records of record_size bytes, record of layout i starts at
+#              header_size + i * record_size:
+#         - occupancy bitmask, ceil(height * width / 8) bytes, bit row * width + column is set for ship cells
+#         - placement number in its catalog of every ship, biggest ships first (placement_catalog.fleet_ships),
+#           2 bytes each, or 4 bytes when a catalog has more than 65535 placements
+
+import argparse  # library to read command line arguments
+import json  # library to write fleet signature into header
+import mmap  # library to map output file into memory
+import multiprocessing  # library to generate layouts in worker processes
+import os  # library to find number of CPUs
+import random  # library to generate random
+import struct  # library to pack header and placement numbers
+
+import layout_sampler  # uniformly random fleet layouts
+import placement_catalog  # catalog of legal ship placements
+
+MAGIC = b"BSLAYOUT"
+VERSION = 1
+HEADER_FORMAT = "<8sHHHBxQII"  # magic, version, height, width, placement bytes, count, record size, header size
+HEADER_ALIGNMENT = 64  # records start at multiple of it
+CHUNK_SIZE = 10000  # layouts generated by a worker at once
+
+
+def generate_layouts(height, width, fleet, count=None, seed=None):
+    """
+    Yield random fleet layouts without touching game maps or fleets.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        fleet (dict): Fleet dictionary, only sizes and quantities are used.
+        count (int): Number of layouts, endless when None. Default is None.
+        seed (int): Seed of a private random generator, None draws from the shared random module. Default is None.
+
+    Yields:
+        list: List of (ship_name, row, column, alignment), one item per ship, biggest ships first.
+    """
+    generator = random.Random(seed) if seed is not None else random
+    generated = 0
+    while count is None or generated < count:
+        yield layout_sampler.sample_layout(height, width, fleet, generator)
+        generated += 1
+
+
+class RecordFormat:
+    """Fixed-width packed record of a layout, see module description."""
+
+    def __init__(self, height, width, fleet):
+        self.height = height
+        self.width = width
+        self.ships = placement_catalog.fleet_ships(fleet)
+        self.catalogs = [placement_catalog.get_placement_catalog(height, width, size) for _, size in self.ships]
+        self.mask_size = (height * width + 7) // 8
+        self.placement_bytes = 2 if all(len(catalog) <= 0xFFFF for catalog in self.catalogs) else 4
+        self.placements_format = "<" + ("H" if self.placement_bytes == 2 else "I") * len(self.ships)
+        self.record_size = self.mask_size + self.placement_bytes * len(self.ships)
+
+    def pack_into(self, buffer, offset, layout):
+        """Write a layout (list of (ship_name, row, column, alignment), in fleet_ships order) at offset."""
+        occupied = 0
+        placements = []
+        for catalog, (_, row, column, alignment) in zip(self.catalogs, layout):
+            placement = catalog.placement_index(row, column, alignment)
+            occupied |= catalog.mask(placement)
+            placements.append(placement)
+        buffer[offset:offset + self.mask_size] = occupied.to_bytes(self.mask_size, "little")
+        struct.pack_into(self.placements_format, buffer, offset + self.mask_size, *placements)
+
+    def unpack_mask(self, buffer, offset):
+        """Return occupancy bitmask of the record at offset."""
+        return int.from_bytes(buffer[offset:offset + self.mask_size], "little")
+
+    def unpack_layout(self, buffer, offset):
+        """Return layout of the record at offset, as list of (ship_name, row, column, alignment)."""
+        placements = struct.unpack_from(self.placements_format, buffer, offset + self.mask_size)
+        return [(ship_name, *catalog.placement(placement))
+                for (ship_name, _), catalog, placement in zip(self.ships, self.catalogs, placements)]
+
+
+def _header_size(signature_json):
+    """Return header size with signature, rounded up to HEADER_ALIGNMENT."""
+    size = struct.calcsize(HEADER_FORMAT) + len(signature_json)
+    return -(-size // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+
+
+def create_layout_file(path, height, width, fleet, count):
+    """
+    Create a layout file with header and space for count records, records are filled with zeros.
+
+    Returns:
+        int: Header size, offset of the first record.
+    """
+    record_format = RecordFormat(height, width, fleet)
+    signature_json = json.dumps(placement_catalog.fleet_signature(fleet)).encode()
+    header_size = _header_size(signature_json)
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, height, width, record_format.placement_bytes,
+                         count, record_format.record_size, header_size) + signature_json
+    with open(path, "wb") as file:
+        file.write(header.ljust(header_size, b"\0"))
+        file.truncate(header_size + count * record_format.record_size)
+    return header_size
+
+
+def _write_chunk(task):
+    """
+    Worker task: generate layouts of a chunk and write them straight into the mapped file.
+
+    Args:
+        task (tuple): (path, height, width, fleet, header_size, first record, number of records, seed).
+
+    Returns:
+        int: Number of written records.
+    """
+    path, height, width, fleet, header_size, first, count, seed = task
+    record_format = RecordFormat(height, width, fleet)
+    with open(path, "r+b") as file, mmap.mmap(file.fileno(), 0) as buffer:
+        offset = header_size + first * record_format.record_size
+        for layout in generate_layouts(height, width, fleet, count, seed):
+            record_format.pack_into(buffer, offset, layout)
+            offset += record_format.record_size
+    return count
+
+
+def write_layout_file(path, height, width, fleet, count, workers=1, seed=0, chunk_size=CHUNK_SIZE):
+    """
+    Generate count layouts into a file, chunks of records are generated and written by worker processes.
+
+    Every chunk uses its own seed (seed + chunk number), so the file does not depend on number of workers.
+
+    Args:
+        path (str): Path of the output file.
+        height (int): Height of the map.
+        width (int): Width of the map.
+        fleet (dict): Fleet dictionary, only sizes and quantities are used.
+        count (int): Number of layouts.
+        workers (int): Number of worker processes. Default is 1.
+        seed (int): Seed of the first chunk. Default is 0.
+        chunk_size (int): Layouts per worker task. Default is CHUNK_SIZE.
+    """
+    # copy without coordinates, it is sent to every worker task
+    fleet = {ship_name: {"Size": ship_info["Size"], "Quantity": ship_info["Quantity"], "Coordinates": []}
+             for ship_name, ship_info in fleet.items()}
+    header_size = create_layout_file(path, height, width, fleet, count)
+    tasks = [(path, height, width, fleet, header_size, first, min(chunk_size, count - first), seed + number)
+             for number, first in enumerate(range(0, count, chunk_size))]
+    if workers <= 1:
+        for task in tasks:
+            _write_chunk(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for _ in pool.imap_unordered(_write_chunk, tasks):
+            pass
+
+
+class LayoutFile:
+    """
+    Read-only random access to a layout file, records are read from the memory map when they are asked for.
+
+    Usage example:
+        with LayoutFile("layouts.bin") as layouts:
+            layout = layouts[123]  # list of (ship_name, row, column, alignment)
+            occupied = layouts.mask(123)  # bitmask of ship cells
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.height, self.width, placement_bytes, self.count,
+         record_size, self.header_size) = struct.unpack_from(HEADER_FORMAT, self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a layout file of version {VERSION}.")
+        signature_json = self.buffer[struct.calcsize(HEADER_FORMAT):self.header_size].rstrip(b"\0")
+        self.fleet = {ship_name: {"Size": size, "Quantity": quantity, "Coordinates": []}
+                      for ship_name, size, quantity in json.loads(signature_json)}
+        self.format = RecordFormat(self.height, self.width, self.fleet)
+        if self.format.record_size != record_size or self.format.placement_bytes != placement_bytes:
+            self.close()
+            raise ValueError(f"{path} records do not match its fleet.")
+
+    def _offset(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("layout index out of range")
+        return self.header_size + index * self.format.record_size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.format.unpack_layout(self.buffer, self._offset(index))
+
+    def mask(self, index):
+        """Return occupancy bitmask of a layout."""
+        return self.format.unpack_mask(self.buffer, self._offset(index))
+
+    def close(self):
+        """Unmap and close the file."""
+        self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Read command line arguments and generate layouts of DEFAULT_FLEET."""
+    import game_loader  # loads CPU vs CPU game code by path
+    game = game_loader.load_game()  # default fleet and map size
+
+    parser = argparse.ArgumentParser(description="Generate random CPU fleet layouts into a binary file.")
+    parser.add_argument("--count", type=int, default=100000, help="number of layouts")
+    parser.add_argument("--height", type=int, default=game.MAP_HEIGHT, help="height of the map")
+    parser.add_argument("--width", type=int, default=game.MAP_WIDTH, help="width of the map")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first chunk of layouts")
+    parser.add_argument("--output", default="layouts.bin", help="output file")
+    arguments = parser.parse_args()
+    write_layout_file(arguments.output, arguments.height, arguments.width, game.DEFAULT_FLEET,
+                      arguments.count, arguments.workers, arguments.seed)
+    print(f"Wrote {arguments.count} layouts to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
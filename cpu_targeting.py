@@ -0,0 +1,288 @@
+# battleship cpu_targeting.py - CPU targeting engines, choosing where to shoot next
+
+import random  # library to generate random
+
+import board  # cell states of padded boards
+import placement_catalog  # catalog of legal ship placements
+
+
+def best_target_cell(grid, cluster_cells, ship_counts):
+    """
+    Target-mode engine: list feasible placements of every ship left through a cluster of unsunk hits
+    and choose the free cell covered by most of them.
+
+    A placement is feasible when none of its cells was missed, belongs to a sunk ship or is outside of
+    the map (SHOT or BORDER cells of the padded grid). Every placement counts once for every ship of its
+    length left, times the square of the number of cluster hits it covers, so placements explaining more hits
+    weigh much more (a ship lying along a line of hits is likelier than ships lying across it).
+
+    Args:
+        grid (PaddedBoard): Cell states of CPU shots.
+        cluster_cells (list): Coordinates [row, column] of hits of the cluster.
+        ship_counts (dict): Ship length -> number of ships of the length left.
+
+    Returns:
+        tuple: (row, column) of the best cell, ties are broken at random, (None, None) if no ship fits through the cluster.
+    """
+    cells = grid.cells
+    hits = {grid.index(row, column) for row, column in cluster_cells}
+    scores = {}  # grid index of free cell -> weight of feasible placements through it
+    for length, count in ship_counts.items():
+        seen = set()  # (start, step) of placements already counted
+        for hit in hits:
+            for step in ((1,) if length == 1 else (1, grid.row_width)):
+                for shift in range(length):
+                    start = hit - shift * step
+                    if start < 0 or (start, step) in seen:
+                        continue
+                    seen.add((start, step))
+                    placement = range(start, start + length * step, step)
+                    if any(cells[index] == board.SHOT or cells[index] == board.BORDER for index in placement):
+                        continue
+                    weight = count * sum(1 for index in placement if index in hits) ** 2
+                    for index in placement:
+                        if cells[index] == board.FREE:
+                            scores[index] = scores.get(index, 0) + weight
+    if not scores:
+        return None, None
+    best_score = max(scores.values())
+    return grid.coordinates(random.choice([index for index, score in scores.items() if score == best_score]))
+
+
+SPARSE_CANDIDATES = 64  # random untouched cells scored per hunt move by sampled_density_cell
+SPARSE_TRIES = 16  # random cells drawn per candidate, before giving up on finding untouched cells
+
+
+def _free_run(game_map, row, column, row_step, column_step, limit, default_symbol):
+    """Return number of untouched cells in a line next to [row, column], going one direction, up to limit."""
+    height, width = len(game_map), len(game_map[0])
+    run = 0
+    while run < limit:
+        row, column = row + row_step, column + column_step
+        if not (0 <= row < height and 0 <= column < width) or game_map.get_cell(row, column) != default_symbol:
+            break
+        run += 1
+    return run
+
+
+def sampled_density_cell(game_map, ship_counts, default_symbol, candidates=SPARSE_CANDIDATES):
+    """
+    Hunt-mode engine for maps too big for PlacementDensity (like TiledBoard): random untouched cells
+    are scored by number of legal placements of ships left through them, the best one is chosen.
+
+    Only cells in line with the candidates, up to the longest ship away, are read, so time and memory
+    of a move do not grow with map area.
+
+    Args:
+        game_map (Board or TiledBoard): Map the CPU is shooting at (hidden map).
+        ship_counts (dict): Ship length -> number of ships of the length left.
+        default_symbol (str): Symbol of untouched cells.
+        candidates (int): Number of untouched cells to score. Default is SPARSE_CANDIDATES.
+
+    Returns:
+        tuple: (row, column) of the best cell, ties are broken at random, (None, None) if no untouched cell was drawn.
+    """
+    height, width = len(game_map), len(game_map[0])
+    reach = max((length for length, count in ship_counts.items() if count), default=1) - 1
+    best_density = -1
+    best_cells = []
+    scored = 0
+    for _ in range(candidates * SPARSE_TRIES):
+        if scored == candidates:
+            break
+        row, column = random.randrange(height), random.randrange(width)
+        if game_map.get_cell(row, column) != default_symbol:
+            continue
+        scored += 1
+        left, right, up, down = (_free_run(game_map, row, column, row_step, column_step, reach, default_symbol)
+                                 for row_step, column_step in ((0, -1), (0, 1), (-1, 0), (1, 0)))
+        density = 0
+        for length, count in ship_counts.items():
+            # placements of a line of free cells through the cell, the cell can be any of the ship cells
+            density += count * max(0, min(left, length - 1) + min(right, length - 1) - length + 2)
+            if length > 1:
+                density += count * max(0, min(up, length - 1) + min(down, length - 1) - length + 2)
+        if density > best_density:
+            best_density = density
+            best_cells = [(row, column)]
+        elif density == best_density:
+            best_cells.append((row, column))
+    if not best_cells:
+        return None, None
+    return random.choice(best_cells)
+
+
+class PlacementDensity:
+    """
+    Placement-count heatmap for the CPU hunt phase. It keeps lists over every cell, so maps of
+    board.TILED_MIN_CELLS cells or more are hunted with sampled_density_cell instead.
+
+    For every cell it counts legal placements of every remaining ship, given cells already shot
+    (misses and sunk ships). Counts are updated incrementally: a shot invalidates only placements
+    going through that cell, a sunk ship only changes the weight of its length.
+    Hunt phase has no damaged but unsunk ships, so every touched cell blocks placements.
+    """
+
+    def __init__(self, game_map, default_symbol):
+        """
+        Args:
+            game_map (list or Board): Map the CPU is shooting at (hidden map).
+            default_symbol (str): Symbol of untouched cells.
+        """
+        self.game_map = game_map
+        self.default_symbol = default_symbol
+        self.height = len(game_map)
+        self.width = len(game_map[0])
+        self.blocked = set()  # cell indexes which can not hold a ship anymore
+        self.quantities = {}  # ship length -> number of ships left
+        self.catalogs = {}  # ship length -> PlacementCatalog
+        self.valid = {}  # ship length -> list of flags, is the placement still legal
+        self.counts = {}  # ship length -> per cell number of legal placements covering the cell
+        self.density = [0] * (self.height * self.width)  # counts weighted by ships left
+        self.map_version = 0  # last version of Board map seen
+        self.lattice = None  # (spacing, residue) of hunting lattice, see best_lattice_cell
+
+    def _add_length(self, length):
+        """Take placements of a new ship length from its catalog, dropping ones through blocked cells."""
+        catalog = placement_catalog.get_placement_catalog(self.height, self.width, length)
+        self.catalogs[length] = catalog
+        self.valid[length] = [True] * len(catalog)
+        self.counts[length] = list(catalog.fit_counts)  # placements through every cell on empty map
+        self.quantities[length] = 0
+        for index in self.blocked:
+            self._block_placements(length, index)
+
+    def _block_placements(self, length, index):
+        """Make placements of a ship length through the cell illegal."""
+        catalog = self.catalogs[length]
+        valid = self.valid[length]
+        counts = self.counts[length]
+        quantity = self.quantities[length]
+        for placement_id in catalog.covering(index):
+            if valid[placement_id]:
+                valid[placement_id] = False
+                for cell in catalog.placement_cells(placement_id):
+                    counts[cell] -= 1
+                    self.density[cell] -= quantity
+
+    def sync_fleet(self, fleet):
+        """
+        Update number of ships left of every length, adjusting density of lengths which changed.
+
+        Args:
+            fleet (dict): Fleet the CPU is shooting at, like fleet_cpu.
+        """
+        quantities = {}
+        for ship_info in fleet.values():
+            if ship_info["Quantity"] > 0:
+                quantities[ship_info["Size"]] = quantities.get(ship_info["Size"], 0) + ship_info["Quantity"]
+        for length in set(quantities) | set(self.quantities):
+            if length not in self.catalogs:
+                self._add_length(length)
+            change = quantities.get(length, 0) - self.quantities[length]
+            if change:
+                for cell, count in enumerate(self.counts[length]):
+                    if count:
+                        self.density[cell] += change * count
+                self.quantities[length] = quantities.get(length, 0)
+
+    def block_cell(self, row, column):
+        """
+        Mark the cell as shot, every legal placement through it becomes illegal.
+
+        Args:
+            row (int): Row of the cell.
+            column (int): Column of the cell.
+        """
+        index = row * self.width + column
+        if index in self.blocked:
+            return
+        self.blocked.add(index)
+        for length in self.catalogs:
+            self._block_placements(length, index)
+
+    def sync_map(self):
+        """
+        Block cells touched on the map since the last call.
+
+        Board and TiledBoard maps report changed cells from their journal, list maps are scanned.
+        """
+        game_map = self.game_map
+        if hasattr(game_map, "changes"):
+            for index in game_map.changes[self.map_version:]:
+                row, column = divmod(index, self.width)
+                if game_map.get_cell(row, column) != self.default_symbol:
+                    self.block_cell(row, column)
+            self.map_version = game_map.version
+        else:
+            for row, map_row in enumerate(game_map):
+                for column, value in enumerate(map_row):
+                    if value != self.default_symbol:
+                        self.block_cell(row, column)
+
+    def best_cell(self):
+        """
+        Return an untouched cell covered by most legal placements, ties are broken at random.
+
+        Returns:
+            tuple: (row, column) of the best cell, (None, None) if every cell was shot.
+        """
+        best_density = -1
+        best_cells = []
+        for cell, density in enumerate(self.density):
+            if cell in self.blocked:
+                continue
+            if density > best_density:
+                best_density = density
+                best_cells = [cell]
+            elif density == best_density:
+                best_cells.append(cell)
+        if not best_cells:
+            return None, None
+        cell = random.choice(best_cells)
+        return cell // self.width, cell % self.width
+
+    def _lattice_cells(self, spacing, residue):
+        """Yield cells with (row + column) % spacing == residue, row by row."""
+        width = self.width
+        for row in range(self.height):
+            for column in range((residue - row) % spacing, width, spacing):
+                yield row * width + column
+
+    def best_lattice_cell(self, spacing):
+        """
+        Return an untouched cell of the hunting lattice covered by most legal placements, ties are broken at random.
+
+        A ship of length spacing or longer covers a cell of every lattice of cells with
+        (row + column) % spacing == residue, so hunting on one lattice misses no ship. The lattice
+        with most placement density is chosen when spacing changes (the smallest ship left was sunk),
+        and kept while spacing is the same, so earlier shots on the lattice are not wasted.
+
+        Args:
+            spacing (int): Length of the smallest ship left.
+
+        Returns:
+            tuple: (row, column) of the best cell, best_cell() when no lattice cell can hold a ship.
+        """
+        density, blocked = self.density, self.blocked
+        if self.lattice is None or self.lattice[0] != spacing:
+            totals = [0] * spacing
+            for residue in range(spacing):
+                totals[residue] = sum(density[cell] for cell in self._lattice_cells(spacing, residue)
+                                      if cell not in blocked)
+            self.lattice = (spacing, max(range(spacing), key=totals.__getitem__))
+        best_density = 0
+        best_cells = []
+        for cell in self._lattice_cells(*self.lattice):
+            if cell in blocked:
+                continue
+            cell_density = density[cell]
+            if cell_density > best_density:
+                best_density = cell_density
+                best_cells = [cell]
+            elif cell_density == best_density and best_density:
+                best_cells.append(cell)
+        if not best_cells:
+            return self.best_cell()
+        cell = random.choice(best_cells)
+        return cell // self.width, cell % self.width
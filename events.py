@@ -0,0 +1,161 @@
+# battleship events.py - structured event bus for game tracing, with levels and pluggable sinks
+#
+# Game functions emit events instead of printing. Nothing is formatted when no sink listens
+# to the event level, so tracing costs only a function call and a comparison:
+#     events.debug("search_map_for_pattern", "coordinates found {}", coordinates)
+# For arguments which are expensive to build, check the level first:
+#     if events.is_enabled(events.DEBUG):
+#         events.debug("remove_coordinates_from_fleet", "{}", format_fleet(fleet))
+
+import collections  # library for ring buffer (deque)
+import sys  # library to find current standard output
+import time  # library to timestamp events
+
+# Event levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+DISABLED = 100  # level of the bus when no sink is added
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+sinks = []  # list of [level, sink], sink is called with every event of its level or higher
+lowest_level = DISABLED  # lowest level any sink listens to, events below it are dropped at once
+
+
+class Event:
+    """Single traced event, message is formatted only when a sink asks for text."""
+    __slots__ = ("level", "name", "message", "args", "time_ns")
+
+    def __init__(self, level, name, message, args):
+        self.level = level
+        self.name = name  # name of the event, usually function emitting it
+        self.message = message  # message with {} placeholders for args
+        self.args = args
+        self.time_ns = time.perf_counter_ns()
+
+    def text(self):
+        """Return message with args filled in."""
+        return self.message.format(*self.args) if self.args else self.message
+
+    def freeze(self):
+        """
+        Format the message now and drop references to args, for sinks keeping events.
+
+        Args are often live game objects (maps, fleets, shot logs), formatting them later would show
+        their state at read time instead of emit time.
+        """
+        if self.args:
+            self.message = self.text()
+            self.args = ()
+
+
+class StdoutSink:
+    """Sink printing event messages to standard output, same as print did before."""
+
+    def __call__(self, event):
+        print(event.text(), file=sys.stdout)
+
+
+class FileSink:
+    """Sink writing one line per event to a file: time, level, event name and message."""
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def __call__(self, event):
+        self.file.write(f"{event.time_ns} {LEVEL_NAMES.get(event.level, event.level)} {event.name}: {event.text()}\n")
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+
+class RingBufferSink:
+    """Sink keeping only the last events in memory, messages are formatted when events are kept."""
+
+    def __init__(self, capacity=1000):
+        self.buffer = collections.deque(maxlen=capacity)
+
+    def __call__(self, event):
+        event.freeze()  # kept events must show state at emit time
+        self.buffer.append(event)
+
+    def events(self):
+        """Return list of kept events, oldest first."""
+        return list(self.buffer)
+
+    def texts(self):
+        """Return list of kept event messages, oldest first."""
+        return [event.text() for event in self.buffer]
+
+
+def add_sink(sink, level=DEBUG):
+    """
+    Add a sink to the bus.
+
+    Args:
+        sink (callable): Called with every Event of given level or higher.
+        level (int): Lowest level of events sent to the sink. Default is DEBUG.
+    """
+    global lowest_level
+    sinks.append([level, sink])
+    lowest_level = min(lowest_level, level)
+
+
+def remove_sink(sink):
+    """Remove a sink from the bus."""
+    global lowest_level
+    sinks[:] = [entry for entry in sinks if entry[1] is not sink]
+    lowest_level = min((entry[0] for entry in sinks), default=DISABLED)
+
+
+def clear_sinks():
+    """Remove all sinks, every event is dropped after that."""
+    global lowest_level
+    sinks.clear()
+    lowest_level = DISABLED
+
+
+def is_enabled(level):
+    """Check if any sink listens to events of the level."""
+    return level >= lowest_level
+
+
+def emit(level, name, message, *args):
+    """
+    Send an event to sinks listening to its level.
+
+    Args:
+        level (int): Event level (DEBUG, INFO or WARNING).
+        name (str): Name of the event, usually function emitting it.
+        message (str): Message with {} placeholders, formatted only when a sink needs text.
+        *args: Values of placeholders, passed by reference, sinks keeping events format them at once.
+    """
+    if level < lowest_level:
+        return
+    event = Event(level, name, message, args)
+    for sink_level, sink in sinks:
+        if level >= sink_level:
+            sink(event)
+
+
+def debug(name, message, *args):
+    """Send DEBUG event, see emit."""
+    if DEBUG < lowest_level:
+        return
+    emit(DEBUG, name, message, *args)
+
+
+def info(name, message, *args):
+    """Send INFO event, see emit."""
+    if INFO < lowest_level:
+        return
+    emit(INFO, name, message, *args)
+
+
+def warning(name, message, *args):
+    """Send WARNING event, see emit."""
+    if WARNING < lowest_level:
+        return
+    emit(WARNING, name, message, *args)
@@ -0,0 +1,285 @@
+# battleship fleet_model.py - fleet dictionaries with fast lookup of ship cells and per-ship health
+
+import bisect  # library to keep ship sizes sorted
+
+
+_ship_types = {}  # (name, size) -> ShipType, shared by every fleet
+
+
+class ShipType:
+    """
+    Immutable spec of a ship type, shared by every ship of the type in every game.
+
+    Attributes:
+        name (str): Name of the ship type.
+        size (int): Number of ship cells.
+    """
+
+    __slots__ = ("name", "size")
+
+    def __init__(self, name, size):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "size", size)
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"ShipType({self.name!r}, {self.size})"
+
+
+def get_ship_type(name, size):
+    """Return ShipType of given name and size, it is created only once."""
+    key = (name, size)
+    if key not in _ship_types:
+        _ship_types[key] = ShipType(name, size)
+    return _ship_types[key]
+
+
+class ShipInstance:
+    """
+    A deployed ship.
+
+    Attributes:
+        ship_type (ShipType): Type of the ship.
+        coordinates (list): List of [row, column] coordinates of the ship, the same list as in
+                            fleet[ship_name]["Coordinates"].
+        instance_id (int): Index of coordinates in fleet[ship_name]["Coordinates"].
+        health (int): Number of ship cells not hit yet.
+        hit_mask (int): Bitmask of hit ship cells, bit i is set when coordinates[i] was hit.
+    """
+
+    __slots__ = ("ship_type", "coordinates", "instance_id", "health", "hit_mask")
+
+    def __init__(self, ship_type, coordinates, instance_id, health=None, hit_mask=0):
+        self.ship_type = ship_type
+        self.coordinates = coordinates
+        self.instance_id = instance_id
+        self.health = len(coordinates) if health is None else health
+        self.hit_mask = hit_mask
+
+    def hit(self, segment_index):
+        """
+        Mark a ship cell as hit, a cell hit again does not change health.
+
+        Args:
+            segment_index (int): Index of the cell in coordinates.
+
+        Returns:
+            bool: True if the ship was sunk by this hit.
+        """
+        bit = 1 << segment_index
+        if self.hit_mask & bit:
+            return False
+        self.hit_mask |= bit
+        self.health -= 1
+        return self.health == 0
+
+    def __repr__(self):
+        return f"ShipInstance({self.ship_type.name!r}, {self.coordinates}, health={self.health})"
+
+
+class ShipSizes:
+    """
+    Sorted multiset of sizes of ships afloat, with names of ship types of every size.
+
+    Largest, smallest and count by size are O(1), adding or removing a ship is O(log n) search
+    of the sorted sizes list, plus a list shift only when a size appears or disappears.
+    """
+
+    def __init__(self, fleet=None):
+        """
+        Args:
+            fleet (dict): Fleet dictionary, ships with quantity above zero are added. Default is None.
+        """
+        self.sizes = []  # distinct sizes, ascending
+        self.counts = {}  # size -> number of ships
+        self.names = {}  # size -> {ship name: number of ships}, in fleet order
+        self.total = 0  # number of ships
+        if fleet is not None:
+            for ship_name, ship_info in fleet.items():
+                if ship_info["Quantity"] > 0:
+                    self.add(ship_name, ship_info["Size"], ship_info["Quantity"])
+
+    def add(self, ship_name, size, quantity=1):
+        """Add ships of a type."""
+        if size not in self.counts:
+            bisect.insort(self.sizes, size)
+            self.counts[size] = 0
+            self.names[size] = {}
+        self.counts[size] += quantity
+        names = self.names[size]
+        names[ship_name] = names.get(ship_name, 0) + quantity
+        self.total += quantity
+
+    def remove(self, ship_name, size):
+        """Remove a ship of a type, ships which are not in the multiset are ignored."""
+        names = self.names.get(size)
+        if not names or ship_name not in names:
+            return
+        names[ship_name] -= 1
+        if not names[ship_name]:
+            del names[ship_name]
+        self.counts[size] -= 1
+        self.total -= 1
+        if not self.counts[size]:
+            del self.counts[size], self.names[size]
+            del self.sizes[bisect.bisect_left(self.sizes, size)]
+
+    def __len__(self):
+        return self.total
+
+    def largest(self):
+        """Return size of the biggest ship afloat, None if there are no ships."""
+        return self.sizes[-1] if self.sizes else None
+
+    def smallest(self):
+        """Return size of the smallest ship afloat, None if there are no ships."""
+        return self.sizes[0] if self.sizes else None
+
+    def count(self, size):
+        """Return number of ships of a size afloat."""
+        return self.counts.get(size, 0)
+
+    def biggest_ship(self):
+        """Return (ship name, size) of the biggest ship, first in fleet order, None if there are no ships."""
+        if not self.sizes:
+            return None
+        size = self.sizes[-1]
+        return next(iter(self.names[size])), size
+
+    def copy(self):
+        """Return an independent copy of the multiset."""
+        ship_sizes = ShipSizes()
+        ship_sizes.sizes = list(self.sizes)
+        ship_sizes.counts = dict(self.counts)
+        ship_sizes.names = {size: dict(names) for size, names in self.names.items()}
+        ship_sizes.total = self.total
+        return ship_sizes
+
+
+class IndexedFleet(dict):
+    """
+    Fleet dictionary (ship name -> {"Size", "Quantity", "Coordinates"}) which also keeps an index
+    of ship cells, so the ship on given coordinates is found with a single dict lookup, and
+    a ShipInstance of every deployed ship, which counts its health.
+
+    It is used everywhere a fleet dictionary is used, index is filled when ships are deployed
+    and updated when ships are removed. Sizes of ships (ship_sizes) follow quantities, which have to be
+    changed with set_quantity.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cell_index = {}  # (row, column) -> (ShipInstance, segment_index)
+        self.instances = {}  # ship name -> ShipInstance of every coordinates list in fleet[ship_name]["Coordinates"]
+        self.ship_sizes = ShipSizes(self)  # sorted multiset of sizes, every ship type counted by its quantity
+
+    @classmethod
+    def from_fleet(cls, fleet):
+        """
+        Create a fleet without deployed ships from a fleet dictionary (like DEFAULT_FLEET),
+        cheaper than a deep copy, as only sizes and quantities are copied.
+        """
+        return cls((ship_name, {"Size": ship_info["Size"], "Quantity": ship_info["Quantity"], "Coordinates": []})
+                   for ship_name, ship_info in fleet.items())
+
+    def set_quantity(self, ship_name, quantity):
+        """Set quantity of a ship type, ship_sizes is changed the same way."""
+        ship_info = self[ship_name]
+        change = quantity - ship_info["Quantity"]
+        ship_info["Quantity"] = quantity
+        if change > 0:
+            self.ship_sizes.add(ship_name, ship_info["Size"], change)
+        for _ in range(-change):
+            self.ship_sizes.remove(ship_name, ship_info["Size"])
+
+    def index_ship(self, ship_name, instance_id, coordinates_list):
+        """
+        Add cells of a deployed ship to the index.
+
+        Args:
+            ship_name (str): Name of the ship.
+            instance_id (int): Index of the ship coordinates list in fleet[ship_name]["Coordinates"].
+            coordinates_list (list): List of [row, column] coordinates of the ship.
+        """
+        instance = ShipInstance(get_ship_type(ship_name, self[ship_name]["Size"]), coordinates_list, instance_id)
+        instances = self.instances.setdefault(ship_name, [])
+        instances.insert(instance_id, instance)
+        for later_id in range(instance_id + 1, len(instances)):
+            instances[later_id].instance_id = later_id
+        for segment_index, (row, column) in enumerate(coordinates_list):
+            self.cell_index[(row, column)] = (instance, segment_index)
+
+    def find_cell(self, row, column):
+        """
+        Find the ship on the cell.
+
+        Args:
+            row (int): Row of the cell.
+            column (int): Column of the cell.
+
+        Returns:
+            tuple: (ship_name, instance_id, segment_index), None if there is no ship on the cell.
+        """
+        found = self.cell_index.get((row, column))
+        if found is None:
+            return None
+        instance, segment_index = found
+        return instance.ship_type.name, instance.instance_id, segment_index
+
+    def find_ship(self, row, column):
+        """
+        Find the ship on the cell.
+
+        Returns:
+            tuple: (ShipInstance, segment_index), None if there is no ship on the cell.
+        """
+        return self.cell_index.get((row, column))
+
+    def unindex_ship(self, ship_name, removed_coordinates):
+        """
+        Remove cells of a ship from the index, after its coordinates list was deleted from the fleet.
+        Ships of the same type deployed later move one place down in the coordinates list,
+        so their instance ids are updated too.
+
+        Args:
+            ship_name (str): Name of the removed ship.
+            removed_coordinates (list): List of [row, column] coordinates of the removed ship.
+        """
+        removed = None
+        for row, column in removed_coordinates:
+            found = self.cell_index.pop((row, column), None)
+            if found is not None:
+                removed = found[0]
+        instances = self.instances.get(ship_name, [])
+        if removed in instances:
+            instances.remove(removed)
+        for instance_id, instance in enumerate(instances):
+            instance.instance_id = instance_id
+        if not instances:
+            self.instances.pop(ship_name, None)
+
+    def copy(self):
+        """
+        Return a copy of the fleet, ships keep their coordinates, health and hits,
+        but share nothing mutable with this fleet.
+        """
+        fleet = type(self)()
+        for ship_name, ship_info in self.items():
+            coordinates = [[list(cell) for cell in coordinates_list] for coordinates_list in ship_info["Coordinates"]]
+            fleet[ship_name] = {"Size": ship_info["Size"], "Quantity": ship_info["Quantity"], "Coordinates": coordinates}
+            for instance, coordinates_list in zip(self.instances.get(ship_name, ()), coordinates):
+                copied = ShipInstance(instance.ship_type, coordinates_list, instance.instance_id,
+                                      instance.health, instance.hit_mask)
+                fleet.instances.setdefault(ship_name, []).append(copied)
+                for segment_index, (row, column) in enumerate(coordinates_list):
+                    fleet.cell_index[(row, column)] = (copied, segment_index)
+        fleet.ship_sizes = self.ship_sizes.copy()
+        return fleet
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
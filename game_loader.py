@@ -0,0 +1,34 @@
+# battleship game_loader.py - loads CPU vs CPU game code (test.py) by its path
+#
+# "import test" finds the standard library test package when the repository directory is not first
+# on sys.path, so tools load test.py by path under its own module name instead.
+
+import importlib.util  # library to load module from file
+import os  # library to build module path
+import sys  # library to register loaded module
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.abspath(__file__))  # directory of game modules
+GAME_PATH = os.path.join(REPOSITORY_DIRECTORY, "test.py")  # CPU vs CPU game code
+GAME_MODULE_NAME = "battleship_game"  # name test.py is registered under in sys.modules
+
+
+def load_game():
+    """
+    Return the CPU vs CPU game module, loaded from test.py once per process.
+
+    Returns:
+        module: The game module.
+    """
+    if GAME_MODULE_NAME in sys.modules:
+        return sys.modules[GAME_MODULE_NAME]
+    if REPOSITORY_DIRECTORY not in sys.path:
+        sys.path.insert(0, REPOSITORY_DIRECTORY)  # game code imports modules next to it
+    spec = importlib.util.spec_from_file_location(GAME_MODULE_NAME, GAME_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[GAME_MODULE_NAME] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[GAME_MODULE_NAME]
+        raise
+    return module
@@ -0,0 +1,209 @@
+# battleship game_state.py - game state with copy-on-write forks, snapshots and undo, for CPU lookahead
+#
+# A GameState holds its own maps, fleet health, log of unsunk hits and actions log, so shots tried
+# on it never touch the live game. Every change is written to a journal:
+#     snapshot() returns journal position, restore(snapshot) reverts changes made after it,
+#     undo() reverts the last shot.
+# fork() returns a new state sharing every part with its parent, a part is copied only by the state
+# changing it first (copy on write), so a search can fork states for free and revert shots in O(changed cells).
+
+import action_log  # compact columnar log of game actions
+
+PARTS = ("map_hidden", "map_display", "fleet", "actions_log")  # mutable parts, copied on first write
+
+
+def copy_map(game_map):
+    """Return an independent copy of a map, list maps are copied row by row, boards copy themselves."""
+    if isinstance(game_map, list):
+        return [list(map_row) for map_row in game_map]  # list.copy() would share rows with the live map
+    return game_map.copy()
+
+
+def ship_alignment(coordinates_list):
+    """Return alignment of a ship from its coordinates: "Single", "Horizontal" or "Vertical"."""
+    if len(coordinates_list) == 1:
+        return "Single"
+    return "Horizontal" if coordinates_list[0][0] == coordinates_list[1][0] else "Vertical"
+
+
+class GameState:
+    """
+    State of a map being shot at, see module description.
+
+    Sunk ships stay in the fleet with zero health, their quantity is decreased, so quantities and
+    fleet.ship_sizes count ships afloat, and ships_afloat counts ships not sunk yet.
+
+    Attributes:
+        map_hidden: Map seen by the shooter, list map or board.
+        map_display: Map showing ships, list map or board.
+        fleet (IndexedFleet): Deployed ships with their health.
+        ship_symbols (dict): Symbols of ship states, like SHIP_SYMBOLS.
+        shot_log (tuple): Coordinates [row, column] of hits on ships not sunk yet, like cpu_shot_log_tmp.
+        actions_log (ActionLog): Log of shots.
+        result (str): "Game Over" when every ship was sunk, otherwise None.
+        ships_afloat (int): Number of ships not sunk yet.
+    """
+
+    def __init__(self, map_hidden, map_display, fleet, ship_symbols, shot_log=(), actions_log=None, result=None):
+        """
+        State takes parts as they are, use capture() to make a state from parts the live game keeps changing.
+
+        Args:
+            map_hidden: Map seen by the shooter, list map or board.
+            map_display: Map showing ships, list map or board.
+            fleet (IndexedFleet): Deployed ships.
+            ship_symbols (dict): Symbols of ship states, like SHIP_SYMBOLS.
+            shot_log (iterable): Coordinates [row, column] of hits on ships not sunk yet. Default is empty.
+            actions_log (ActionLog): Log of shots. Default is a new log.
+            result (str): Game result. Default is None.
+        """
+        self.map_hidden = map_hidden
+        self.map_display = map_display
+        self.fleet = fleet
+        self.ship_symbols = ship_symbols
+        self.shot_log = tuple(shot_log)
+        self.actions_log = actions_log if actions_log is not None else action_log.ActionLog()
+        self.result = result
+        self.ships_afloat = sum(1 for instances in fleet.instances.values()
+                                for instance in instances if instance.health > 0)
+        self.owned = set(PARTS)  # parts not shared with other states
+        self.journal = []  # changes, newest last, see restore
+        self.shot_marks = []  # journal position before every shot, for undo
+
+    @classmethod
+    def capture(cls, map_hidden, map_display, fleet, ship_symbols, shot_log=(), actions_log=None, result=None):
+        """Return a state holding copies of the live game parts, the live game can go on changing them."""
+        return cls(copy_map(map_hidden), copy_map(map_display), fleet.copy(), ship_symbols,
+                   [list(cell) for cell in shot_log], actions_log.copy() if actions_log is not None else None, result)
+
+    def fork(self):
+        """Return a new state sharing every part with this state, parts are copied before they are changed."""
+        state = GameState.__new__(GameState)
+        state.__dict__.update(self.__dict__)
+        self.owned = set()
+        state.owned = set()
+        state.journal = []
+        state.shot_marks = []
+        return state
+
+    def _own(self, part):
+        """Copy a part shared with other states, before it is changed."""
+        if part in self.owned:
+            return
+        value = getattr(self, part)
+        if part == "fleet" or part == "actions_log":
+            setattr(self, part, value.copy())
+        else:
+            setattr(self, part, copy_map(value))
+        self.owned.add(part)
+
+    def _set_cell(self, part, row, column, symbol):
+        """Write a symbol to a map cell, journaling the old symbol."""
+        self._own(part)
+        game_map = getattr(self, part)
+        old_symbol = game_map[row][column]
+        if old_symbol != symbol:
+            self.journal.append(("cell", part, row, column, old_symbol))
+            game_map[row][column] = symbol
+
+    def _set(self, attribute, value):
+        """Set shot_log, result or ships_afloat, journaling the old value."""
+        self.journal.append(("set", attribute, getattr(self, attribute)))
+        setattr(self, attribute, value)
+
+    def _record(self, player, row, column, outcome, ship_name=None):
+        """Log an action, journaling log length."""
+        self._own("actions_log")
+        self.journal.append(("log", len(self.actions_log)))
+        self.actions_log.record(player, row, column, outcome, ship_name)
+
+    def shoot(self, player, row, column):
+        """
+        Shoot at a cell, maps, fleet health and logs change the same way action_perform_shoot changes them.
+
+        Args:
+            player (str): The player making the shot ("CPU" or "Human").
+            row (int): Row of the shot.
+            column (int): Column of the shot.
+
+        Returns:
+            int: Outcome code, action_log.MISS, HIT or SUNK.
+        """
+        symbols = self.ship_symbols
+        self.shot_marks.append(len(self.journal))
+        found = self.fleet.find_ship(row, column)
+        if found is None:
+            self._record(player, row, column, action_log.MISS)
+            self._set_cell("map_hidden", row, column, symbols["Miss"][0])
+            self._set_cell("map_display", row, column, symbols["Miss"][0])
+            return action_log.MISS
+
+        self._own("fleet")
+        instance, segment_index = self.fleet.find_ship(row, column)
+        self.journal.append(("health", instance.ship_type.name, instance.instance_id, instance.health, instance.hit_mask))
+        sunk = instance.hit(segment_index)
+        coordinates_list = instance.coordinates
+        ship_name = instance.ship_type.name
+        sunk_symbols = symbols[ship_alignment(coordinates_list) + "Sunk"]
+        self._set_cell("map_hidden", row, column, symbols["Hit"][0])
+        self._set_cell("map_display", row, column, sunk_symbols[0 if segment_index == 0 else 1])
+        if not sunk:
+            self._set("shot_log", self.shot_log + ([row, column],))
+            self._record(player, row, column, action_log.HIT, ship_name)
+            return action_log.HIT
+
+        for segment_index, (ship_row, ship_column) in enumerate(coordinates_list):
+            self._set_cell("map_hidden", ship_row, ship_column, sunk_symbols[0 if segment_index == 0 else 1])
+        self._record(player, coordinates_list[0][0], coordinates_list[0][1], action_log.SUNK, ship_name)
+        self._set("shot_log", tuple(cell for cell in self.shot_log if cell not in coordinates_list))
+        self._set("ships_afloat", self.ships_afloat - 1)
+        quantity = self.fleet[ship_name]["Quantity"]
+        self.journal.append(("quantity", ship_name, quantity))
+        self.fleet.set_quantity(ship_name, quantity - 1)
+        if not self.ships_afloat:
+            self._record(player, coordinates_list[0][0], coordinates_list[0][1], action_log.GAME_OVER)
+            self._set("result", "Game Over")
+        self._record(player, row, column, action_log.HIT, ship_name)
+        return action_log.SUNK
+
+    def snapshot(self):
+        """Return a snapshot of the state, valid while changes made before it are not reverted."""
+        return len(self.journal)
+
+    def restore(self, snapshot):
+        """Revert every change made after the snapshot."""
+        journal = self.journal
+        while len(journal) > snapshot:
+            change = journal.pop()
+            kind = change[0]
+            if kind == "cell":
+                _, part, row, column, symbol = change
+                self._own(part)  # parts may be shared with forks made after the change
+                getattr(self, part)[row][column] = symbol
+            elif kind == "set":
+                setattr(self, change[1], change[2])
+            elif kind == "log":
+                self._own("actions_log")
+                self.actions_log.truncate(change[1])
+            elif kind == "quantity":
+                self._own("fleet")
+                self.fleet.set_quantity(change[1], change[2])
+            else:
+                _, ship_name, instance_id, health, hit_mask = change
+                self._own("fleet")
+                instance = self.fleet.instances[ship_name][instance_id]
+                instance.health, instance.hit_mask = health, hit_mask
+        while self.shot_marks and self.shot_marks[-1] >= snapshot:
+            self.shot_marks.pop()
+
+    def undo(self):
+        """
+        Revert the last shot.
+
+        Returns:
+            bool: False if there was no shot to revert.
+        """
+        if not self.shot_marks:
+            return False
+        self.restore(self.shot_marks[-1])
+        return True
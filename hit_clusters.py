@@ -0,0 +1,121 @@
+# battleship hit_clusters.py - disjoint-set clusters of hits on ships not sunk yet, for CPU target mode
+
+# Cells are packed as row << 16 | column, same as ShotIndex
+ROW_STEP = 1 << 16  # difference of packed cells in neighbour rows
+
+
+class HitClusters:
+    """
+    Unsunk hits grouped into clusters of touching cells (union-find with path halving and union by size).
+
+    Every cluster keeps its members and bounding rectangle, so its orientation and the two cells
+    extending its segment are known in O(1). Hits of adjacent ships form one cluster, which is not
+    a straight segment, or is a segment with both ends blocked. When a ship is sunk, its cells are peeled off
+    and only the clusters it touched are rebuilt from their remaining cells.
+    """
+
+    def __init__(self):
+        self.parent = {}  # packed cell -> parent cell, roots are their own parents
+        self.members = {}  # root -> packed cells of the cluster
+        self.bounds = {}  # root -> [min row, min column, max row, max column]
+
+    def find(self, cell):
+        """Return root of the cluster of a packed cell."""
+        parent = self.parent
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    def _union(self, first, second):
+        """Join clusters of two packed cells."""
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        if len(self.members[first]) < len(self.members[second]):
+            first, second = second, first
+        self.parent[second] = first
+        self.members[first].extend(self.members.pop(second))
+        bounds, other = self.bounds[first], self.bounds.pop(second)
+        self.bounds[first] = [min(bounds[0], other[0]), min(bounds[1], other[1]),
+                              max(bounds[2], other[2]), max(bounds[3], other[3])]
+
+    def add(self, row, column):
+        """Add a hit, joining clusters of touching hits."""
+        cell = row << 16 | column
+        if cell in self.parent:
+            return
+        self.parent[cell] = cell
+        self.members[cell] = [cell]
+        self.bounds[cell] = [row, column, row, column]
+        for neighbour in (cell - ROW_STEP, cell + ROW_STEP, cell - 1, cell + 1):
+            if neighbour in self.parent:
+                self._union(cell, neighbour)
+
+    def remove(self, coordinates):
+        """
+        Peel cells of a sunk ship off their clusters, clusters split by it are rebuilt.
+
+        Args:
+            coordinates (list): Coordinates [row, column] of the sunk ship.
+        """
+        removed = {row << 16 | column for row, column in coordinates} & self.parent.keys()
+        roots = {self.find(cell) for cell in removed}
+        remaining = []
+        for root in roots:
+            remaining.extend(cell for cell in self.members[root] if cell not in removed)
+            for cell in self.members.pop(root):
+                del self.parent[cell]
+            del self.bounds[root]
+        for cell in remaining:
+            self.add(cell >> 16, cell & 0xFFFF)
+
+    def __len__(self):
+        """Return number of clustered hits."""
+        return len(self.parent)
+
+    def cluster(self, row, column):
+        """Return root of the cluster of a hit, None if the cell is not a clustered hit."""
+        cell = row << 16 | column
+        return self.find(cell) if cell in self.parent else None
+
+    def cells(self, root):
+        """Return coordinates [row, column] of cells of a cluster."""
+        return [[cell >> 16, cell & 0xFFFF] for cell in self.members[root]]
+
+    def orientation(self, root):
+        """
+        Return orientation of a cluster: "Single", "Horizontal" or "Vertical" for straight segments
+        (touching cells of a row or column are always a gapless segment), "Mixed" for other shapes.
+        """
+        min_row, min_column, max_row, max_column = self.bounds[root]
+        if len(self.members[root]) == 1:
+            return "Single"
+        if min_row == max_row:
+            return "Horizontal"
+        if min_column == max_column:
+            return "Vertical"
+        return "Mixed"
+
+    def endpoints(self, root):
+        """
+        Return the two cells extending a straight cluster segment, they may be outside of the map.
+
+        Returns:
+            list: Coordinates [row, column] before and after the segment, empty list for "Single" and "Mixed" clusters.
+        """
+        min_row, min_column, max_row, max_column = self.bounds[root]
+        orientation = self.orientation(root)
+        if orientation == "Horizontal":
+            return [[min_row, min_column - 1], [min_row, max_column + 1]]
+        if orientation == "Vertical":
+            return [[min_row - 1, min_column], [max_row + 1, min_column]]
+        return []
+
+    def copy(self):
+        """Return an independent copy of the clusters."""
+        clusters = HitClusters()
+        clusters.parent = dict(self.parent)
+        clusters.members = {root: list(cells) for root, cells in self.members.items()}
+        clusters.bounds = {root: list(bounds) for root, bounds in self.bounds.items()}
+        return clusters
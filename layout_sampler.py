@@ -0,0 +1,197 @@
+# battleship layout_sampler.py - exactly uniform random fleet layouts
+#
+# Placing ships one by one on free cells prefers some layouts over others. Samplers here pick
+# every legal layout of a fleet with the same probability, two ways:
+#     - counting: layouts are counted cell by cell (row-major), memoized by cell, ships remaining
+#       and frontier (cells ahead already taken by ships started before), then a layout is drawn
+#       by walking the counts. Exact, but number of states grows fast with map size,
+#       so it is used only on small maps.
+#     - rejection: every ship takes a random placement from its whole catalog, the layout is thrown
+#       away at the first overlap. Layouts which are kept are uniform too, as every legal layout
+#       had the same chance to be drawn. Fast while fleet covers a moderate part of the map.
+
+import random  # library to generate random
+
+import events  # event bus for tracing
+import placement_catalog  # catalog of legal ship placements
+
+COUNT_MAX_CELLS = 64  # maps with more cells are not counted
+COUNT_MAX_STATES = 300000  # counting gives up when memo grows bigger
+MAX_REJECTIONS = 100000  # rejection sampling gives up after so many attempts
+
+_samplers = {}  # (height, width, fleet signature) -> LayoutSampler
+
+
+class _TooManyStates(Exception):
+    """Counting memo grew bigger than COUNT_MAX_STATES."""
+
+
+class LayoutSampler:
+    """
+    Uniform sampler of fleet layouts on a map, see module description.
+
+    Attributes:
+        method (str): "counting" or "rejection".
+        layout_count (int): Number of legal layouts when it was counted, else None.
+        uniform (bool): False after rejection sampling failed, the fleet is too dense to sample uniformly.
+    """
+
+    def __init__(self, height, width, fleet):
+        self.height = height
+        self.width = width
+        self.types = [(ship_name, ship_info["Size"]) for ship_name, ship_info in fleet.items()
+                      if ship_info["Quantity"] > 0]
+        self.quantities = tuple(fleet[ship_name]["Quantity"] for ship_name, _ in self.types)
+        self.ships = placement_catalog.fleet_ships(fleet)
+        self.uniform = True
+        self.layout_count = None
+        self._memo = {}  # (cell, ships remaining, frontier) -> number of layouts
+        self.method = "rejection"
+        if all(size <= max(height, width) for _, size in self.types) and height * width <= COUNT_MAX_CELLS:
+            try:
+                self.layout_count = self._count(0, self.quantities, 0)
+                self.method = "counting"
+            except _TooManyStates:
+                self._memo = {}
+        if self.method == "rejection":
+            self.catalogs = [placement_catalog.get_placement_catalog(height, width, size) for _, size in self.ships]
+        if self.layout_count == 0:
+            self.uniform = False
+
+    def _options(self, cell, remaining, frontier):
+        """
+        Yield every choice at a free cell: (ships remaining, next frontier, ship type or None, alignment).
+
+        Frontier bit i is set when cell + i is taken, the first choice leaves the cell empty.
+        """
+        row, column = divmod(cell, self.width)
+        yield remaining, frontier >> 1, None, None
+        for ship_type, (_, size) in enumerate(self.types):
+            if not remaining[ship_type]:
+                continue
+            left = remaining[:ship_type] + (remaining[ship_type] - 1,) + remaining[ship_type + 1:]
+            horizontal = (1 << size) - 1
+            if column + size <= self.width and not frontier & horizontal:
+                yield left, (frontier | horizontal) >> 1, ship_type, "Single" if size == 1 else "Horizontal"
+            vertical = sum(1 << (i * self.width) for i in range(size))
+            if size > 1 and row + size <= self.height and not frontier & vertical:
+                yield left, (frontier | vertical) >> 1, ship_type, "Vertical"
+
+    def _count(self, cell, remaining, frontier):
+        """Return number of ways to deploy remaining ships on cells from cell on."""
+        needed = sum(quantity * size for quantity, (_, size) in zip(remaining, self.types))
+        if not needed:
+            return 1
+        if needed > self.height * self.width - cell - bin(frontier).count("1"):
+            return 0
+        key = (cell, remaining, frontier)
+        count = self._memo.get(key)
+        if count is not None:
+            return count
+        if frontier & 1:
+            count = self._count(cell + 1, remaining, frontier >> 1)
+        else:
+            count = sum(self._count(cell + 1, left, next_frontier)
+                        for left, next_frontier, _, _ in self._options(cell, remaining, frontier))
+        if len(self._memo) >= COUNT_MAX_STATES:
+            raise _TooManyStates()
+        self._memo[key] = count
+        return count
+
+    def _sample_counting(self, generator):
+        """Draw a layout walking the counts, every choice is taken in proportion to its layouts."""
+        layout = []
+        cell, remaining, frontier = 0, self.quantities, 0
+        while any(remaining):
+            if frontier & 1:
+                cell, frontier = cell + 1, frontier >> 1
+                continue
+            choice = generator.randrange(self._count(cell, remaining, frontier))
+            for left, next_frontier, ship_type, alignment in self._options(cell, remaining, frontier):
+                choice -= self._count(cell + 1, left, next_frontier)
+                if choice < 0:
+                    break
+            if ship_type is not None:
+                layout.append((self.types[ship_type][0], *divmod(cell, self.width), alignment))
+            cell, remaining, frontier = cell + 1, left, next_frontier
+        order = {ship_name: (-size, ship_type) for ship_type, (ship_name, size) in enumerate(self.types)}
+        layout.sort(key=lambda ship: order[ship[0]])
+        return layout
+
+    def _sample_rejection(self, max_attempts, generator):
+        """Draw independent placements until none of them overlap."""
+        catalogs = self.catalogs
+        for _ in range(max_attempts):
+            occupied = 0
+            placements = []
+            for catalog in catalogs:
+                placement = generator.randrange(len(catalog))
+                mask = catalog.mask(placement)
+                if occupied & mask:
+                    break
+                occupied |= mask
+                placements.append(placement)
+            else:
+                return [(ship_name, *catalog.placement(placement))
+                        for (ship_name, _), catalog, placement in zip(self.ships, catalogs, placements)]
+        self.uniform = False
+        return None
+
+    def sample(self, max_attempts=MAX_REJECTIONS, generator=random):
+        """
+        Draw a uniformly random legal layout of the fleet.
+
+        Args:
+            max_attempts (int): Attempts of rejection sampling. Default is MAX_REJECTIONS.
+            generator: Source of random numbers, random module or random.Random. Default is random.
+
+        Returns:
+            list: List of (ship_name, row, column, alignment), one item per ship, biggest ships first,
+                  same as placement_catalog.deploy_fleet.
+
+        Raises:
+            ValueError: If the fleet has no legal layout, or it is too dense to be sampled uniformly.
+        """
+        if self.method == "counting":
+            if not self.layout_count:
+                raise ValueError(f"Fleet has no legal layout on {self.width}x{self.height} map.")
+            return self._sample_counting(generator)
+        if self.uniform:
+            layout = self._sample_rejection(max_attempts, generator)
+            if layout is not None:
+                return layout
+        raise ValueError(f"Fleet is too dense to be sampled uniformly on {self.width}x{self.height} map.")
+
+
+def get_layout_sampler(height, width, fleet):
+    """Return layout sampler of a fleet, it is built (and layouts are counted) only once per map size and fleet."""
+    key = (height, width, placement_catalog.fleet_signature(fleet))
+    if key not in _samplers:
+        _samplers[key] = LayoutSampler(height, width, fleet)
+    return _samplers[key]
+
+
+def sample_layout(height, width, fleet, generator=random):
+    """
+    Draw a uniformly random layout of a fleet, or a random layout from deploy_fleet when the fleet
+    is too dense for uniform sampling.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        fleet (dict): Fleet dictionary, only sizes and quantities are used.
+        generator: Source of random numbers, random module or random.Random. Default is random.
+
+    Returns:
+        list: List of (ship_name, row, column, alignment), one item per ship, biggest ships first.
+
+    Raises:
+        ValueError: If the fleet can not be deployed on the map.
+    """
+    sampler = get_layout_sampler(height, width, fleet)
+    if sampler.uniform:
+        try:
+            return sampler.sample(generator=generator)
+        except ValueError:
+            events.warning("sample_layout", "fleet is too dense for uniform layouts on {}x{} map", width, height)
+    return placement_catalog.deploy_fleet(height, width, fleet, generator=generator)
@@ -0,0 +1,139 @@
+# battleship map_search.py - fast search of empty patterns on game maps
+
+try:
+    import numpy as np  # optional library, used for vectorized search on big maps
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # NumPy is missing, pure Python search is used
+    np = None
+    sliding_window_view = None
+
+NUMPY_MIN_CELLS = 2500  # maps with at least this many cells use NumPy ArrayBoard (50x50), see board.make_board
+
+def build_summed_area_table(game_map, default_symbol):
+    """Build a summed-area table (integral image) of touched cells in a map.
+
+    A cell is "touched" when it holds anything other than default_symbol (ship, hit, miss...).
+    Table has one extra row and column of zeros, so table[row][col] holds the number of
+    touched cells in the rectangle from [0, 0] up to (but not including) [row, col].
+
+    Args:
+        game_map (list): 2D list representing the game map.
+        default_symbol (str): Symbol of untouched cells.
+
+    Returns:
+        list: 2D list of size (map_height + 1) x (map_width + 1) with touched cells counts.
+    """
+    map_width = len(game_map[0])
+    table = [[0] * (map_width + 1)]  # first row of zeros
+    for map_row in game_map:
+        previous = table[-1]  # row of table above current one
+        current = [0]  # first column of zeros
+        running = 0  # touched cells count in this map row so far
+        for col, value in enumerate(map_row):
+            if value != default_symbol:
+                running += 1
+            current.append(previous[col + 1] + running)
+        table.append(current)
+    return table
+
+
+def count_touched_cells(table, row, col, height, width):
+    """Count touched cells in a window of the map in O(1) using a summed-area table.
+
+    Args:
+        table (list): Summed-area table built by build_summed_area_table.
+        row (int): Row of the top-left corner of the window.
+        col (int): Column of the top-left corner of the window.
+        height (int): Height of the window.
+        width (int): Width of the window.
+
+    Returns:
+        int: Number of touched cells inside the window.
+    """
+    top = table[row]
+    bottom = table[row + height]
+    return bottom[col + width] - bottom[col] - top[col + width] + top[col]
+
+
+def search_map_for_pattern_sat(game_map, height, width, default_symbol):
+    """
+    Find all top-left coordinates of height x width windows made only of default_symbol.
+
+    Same coordinates and same order (row by row) as the cell by cell search, but every window
+    is tested in O(1), so the full scan costs O(map_height * map_width).
+
+    Args:
+        game_map (list): 2D list representing the game map.
+        height (int): Height of the pattern to search for.
+        width (int): Width of the pattern to search for.
+        default_symbol (str): Symbol of untouched cells.
+
+    Returns:
+        list: A list of coordinates [row, col], empty list if the pattern was not found.
+    """
+    map_height, map_width = len(game_map), len(game_map[0])
+    rows = range(map_height - height + 1)
+    columns = range(map_width - width + 1)
+
+    # empty pattern matches everywhere, same as the cell by cell search
+    if height <= 0 or width <= 0:
+        return [[row, col] for row in rows for col in columns]
+
+    table = build_summed_area_table(game_map, default_symbol)
+    coordinates = []
+    for row in rows:
+        top = table[row]
+        bottom = table[row + height]
+        for col in columns:
+            # window is empty if there are no touched cells inside it
+            if bottom[col + width] - bottom[col] - top[col + width] + top[col] == 0:
+                coordinates.append([row, col])
+    return coordinates
+
+
+def search_array_for_pattern(touched, height, width):
+    """
+    Find all top-left coordinates of height x width windows without touched cells, using NumPy.
+
+    Windows are checked with sliding_window_view in one vectorized call per axis,
+    first every horizontal run of width cells, then height of these runs stacked.
+
+    Args:
+        touched (numpy.ndarray): 2D array, non-zero for touched cells.
+        height (int): Height of the pattern to search for.
+        width (int): Width of the pattern to search for.
+
+    Returns:
+        list: A list of coordinates [row, col] row by row, empty list if the pattern was not found.
+    """
+    map_height, map_width = touched.shape
+    # empty pattern matches everywhere, same as the cell by cell search
+    if height <= 0 or width <= 0:
+        return [[row, col] for row in range(map_height - height + 1) for col in range(map_width - width + 1)]
+    if height > map_height or width > map_width:
+        return []
+    blocked_runs = sliding_window_view(touched, width, axis=1).any(axis=-1)
+    blocked_windows = sliding_window_view(blocked_runs, height, axis=0).any(axis=-1)
+    return np.argwhere(~blocked_windows).tolist()
+
+
+def find_pattern(game_map, height, width, default_symbol):
+    """
+    Find all top-left coordinates of height x width windows made only of default_symbol.
+
+    Boards which have their own search (Board, ArrayBoard, TiledBoard) are searched with it,
+    list maps are searched with summed-area table. Big maps should be made with board.make_board,
+    which picks NumPy ArrayBoard for them when NumPy is installed.
+
+    Args:
+        game_map (list or Board): The map to search.
+        height (int): Height of the pattern to search for.
+        width (int): Width of the pattern to search for.
+        default_symbol (str): Symbol of untouched cells.
+
+    Returns:
+        list: A list of coordinates [row, col], empty list if the pattern was not found.
+    """
+    if hasattr(game_map, "search_pattern"):
+        return game_map.search_pattern(height, width)
+    return search_map_for_pattern_sat(game_map, height, width, default_symbol)
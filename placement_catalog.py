@@ -0,0 +1,321 @@
+# battleship placement_catalog.py - catalog of legal ship placements and fleet deployment engine
+
+import array  # library for typed placement tables
+import random  # library to generate random
+
+FIRST_ATTEMPT_BACKTRACKS = 64  # backtracks allowed before deployment starts over, doubled on every restart
+MAX_BACKTRACKS = 200000  # deployment gives up after so many backtracks in total
+
+ALIGNMENTS = ("Single", "Horizontal", "Vertical")  # alignment codes of placement tables
+CATALOG_TABLES = ("starts", "alignments", "cover_offsets", "cover", "fit_counts")  # see build_catalog_tables
+
+_catalogs = {}  # (height, width, length) -> PlacementCatalog
+
+
+def build_catalog_tables(height, width, length):
+    """
+    Build placement tables of a ship length, placements are numbered horizontal first, then vertical,
+    rows first. Cell index is row * width + column, same as Board.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        length (int): Length of the ship.
+
+    Returns:
+        dict: Table name -> typed array:
+            - starts: placement -> index of first ship cell
+            - alignments: placement -> alignment code (index in ALIGNMENTS)
+            - cover_offsets, cover: placements using cell c are cover[cover_offsets[c]:cover_offsets[c + 1]]
+            - fit_counts: cell -> number of placements using the cell on an empty map
+    """
+    starts = array.array("i")
+    alignments = array.array("B")
+    # horizontal placements, single cell ship has only one alignment
+    for row in range(height):
+        starts.extend(range(row * width, row * width + width - length + 1))
+    alignments.extend([0 if length == 1 else 1] * len(starts))
+    # vertical placements
+    if length > 1:
+        starts.extend(range((height - length + 1) * width))
+        alignments.extend([2] * (len(starts) - len(alignments)))
+
+    cover = [[] for _ in range(height * width)]
+    for placement, start in enumerate(starts):
+        step = width if alignments[placement] == 2 else 1
+        for cell in range(start, start + length * step, step):
+            cover[cell].append(placement)
+    cover_offsets = array.array("i", [0])
+    for placements in cover:
+        cover_offsets.append(cover_offsets[-1] + len(placements))
+    return {
+        "starts": starts,
+        "alignments": alignments,
+        "cover_offsets": cover_offsets,
+        "cover": array.array("i", [placement for placements in cover for placement in placements]),
+        "fit_counts": array.array("i", map(len, cover)),
+    }
+
+
+class PlacementCatalog:
+    """
+    Every legal placement of a ship length on an empty map. Placements are numbered as in
+    build_catalog_tables, so a placement is found from its number without tables. Tables are needed
+    only for placements using a cell, they are built on first use, or come from a memory-mapped file.
+    """
+
+    def __init__(self, height, width, length, tables=None):
+        """
+        Args:
+            height (int): Height of the map.
+            width (int): Width of the map.
+            length (int): Length of the ship.
+            tables (dict): Tables returned by build_catalog_tables, or memoryviews with the same data.
+                           They are built when first needed if None. Default is None.
+        """
+        self.height = height
+        self.width = width
+        self.length = length
+        self._tables = tables
+        self.horizontal_count = height * max(0, width - length + 1)  # horizontal placements come first
+        vertical_count = max(0, height - length + 1) * width if length > 1 else 0
+        self.count = self.horizontal_count + vertical_count
+        self.steps = (1, 1, width)  # alignment code -> distance between ship cells
+        # alignment code -> bitmask of ship cells starting at cell 0, mask of a placement is pattern << start
+        self.patterns = (1, (1 << length) - 1, sum(1 << (i * width) for i in range(length)))
+
+    @property
+    def tables(self):
+        """Placement tables, see build_catalog_tables."""
+        if self._tables is None:
+            self._tables = build_catalog_tables(self.height, self.width, self.length)
+        return self._tables
+
+    @property
+    def fit_counts(self):
+        """Cell -> number of placements using the cell on an empty map."""
+        return self.tables["fit_counts"]
+
+    def __len__(self):
+        return self.count
+
+    def _start(self, placement):
+        """Return (index of first ship cell, alignment code) of the placement."""
+        if placement < self.horizontal_count:
+            row, column = divmod(placement, self.width - self.length + 1)
+            return row * self.width + column, 0 if self.length == 1 else 1
+        return placement - self.horizontal_count, 2
+
+    def placement(self, placement):
+        """Return (row, column, alignment) of the placement."""
+        start, alignment = self._start(placement)
+        return start // self.width, start % self.width, ALIGNMENTS[alignment]
+
+    def placement_cells(self, placement):
+        """Return cell indexes of the placement, as range."""
+        start, alignment = self._start(placement)
+        step = self.steps[alignment]
+        return range(start, start + self.length * step, step)
+
+    def covering(self, cell):
+        """Return placements using the cell."""
+        tables = self.tables
+        offsets = tables["cover_offsets"]
+        return tables["cover"][offsets[cell]:offsets[cell + 1]]
+
+    def mask(self, placement):
+        """Return bitmask of ship cells of the placement, bit row * width + column is set for every cell."""
+        start, alignment = self._start(placement)
+        return self.patterns[alignment] << start
+
+    def placement_index(self, row, column, alignment):
+        """Return number of the placement starting at (row, column) with given alignment."""
+        if alignment == "Vertical":
+            return self.height * (self.width - self.length + 1) + row * self.width + column
+        return row * (self.width - self.length + 1) + column
+
+
+def get_placement_catalog(height, width, length):
+    """Return placement catalog of a ship length, it is built only once per (height, width, length)."""
+    key = (height, width, length)
+    if key not in _catalogs:
+        _catalogs[key] = PlacementCatalog(height, width, length)
+    return _catalogs[key]
+
+
+def register_placement_catalog(catalog):
+    """Use given catalog (like one loaded from table cache) for its map size and ship length."""
+    _catalogs[(catalog.height, catalog.width, catalog.length)] = catalog
+
+
+def fleet_ships(fleet):
+    """
+    List every ship of a fleet, biggest ships first, as they are the hardest to place.
+
+    Args:
+        fleet (dict): Fleet dictionary (ship name -> {"Size", "Quantity", "Coordinates"}).
+
+    Returns:
+        list: List of (ship_name, size), one item per ship.
+    """
+    ships = [(ship_name, ship_info["Size"]) for ship_name, ship_info in fleet.items()
+             for _ in range(ship_info["Quantity"])]
+    ships.sort(key=lambda ship: -ship[1])  # stable, ships of the same size keep fleet order
+    return ships
+
+
+def fleet_signature(fleet):
+    """Return hashable fleet composition, (ship name, size, quantity) of every ship type, ship coordinates are ignored."""
+    return tuple((ship_name, ship_info["Size"], ship_info["Quantity"]) for ship_name, ship_info in fleet.items())
+
+
+class _CompatibleSets:
+    """
+    Placements of every ship length which do not overlap deployed ships.
+
+    Every set is an array with its live placements in front: removing swaps the placement
+    behind the live part, so undoing removals only has to grow the live part back,
+    in reverse order. Random pick and removal are O(1).
+    """
+
+    def __init__(self, catalogs, occupied, generator=random):
+        self.catalogs = catalogs  # length -> PlacementCatalog
+        self.generator = generator  # random or random.Random, picks placements
+        self.alive = {}  # length -> placements, live ones first
+        self.position = {}  # length -> placement -> position in alive
+        self.size = {}  # length -> number of live placements
+        self.log = []  # lengths of removed placements, for undo
+        for length, catalog in catalogs.items():
+            self.alive[length] = list(range(len(catalog)))
+            self.position[length] = list(range(len(catalog)))
+            self.size[length] = len(catalog)
+        for cell in range(occupied.bit_length()):
+            if occupied >> cell & 1:
+                self.remove_cell(cell)
+        self.log.clear()  # occupied cells are never given back
+
+    def remove(self, length, placement):
+        """Remove a placement, if it is still live."""
+        position = self.position[length]
+        index = position[placement]
+        last = self.size[length] - 1
+        if index > last:
+            return
+        alive = self.alive[length]
+        other = alive[last]
+        alive[index], alive[last] = other, placement
+        position[other], position[placement] = index, last
+        self.size[length] = last
+        self.log.append(length)
+
+    def remove_cell(self, cell):
+        """Remove every placement using the cell."""
+        for length, catalog in self.catalogs.items():
+            for placement in catalog.covering(cell):
+                self.remove(length, placement)
+
+    def pick(self, length):
+        """Return a random live placement of the length."""
+        return self.alive[length][self.generator.randrange(self.size[length])]
+
+    def undo(self, mark):
+        """Give back placements removed since log had mark items."""
+        log, size = self.log, self.size
+        while len(log) > mark:
+            size[log.pop()] += 1
+
+
+def _search(catalogs, lengths, needed, occupied, budget, generator=random):
+    """
+    Depth first search of placements for ships of given lengths.
+
+    Every ship takes a random compatible placement, when a ship has no compatible placement left
+    (or the ships left can not fit any more) the previous ship is moved. A placement which failed
+    is not tried again at the same depth, so ships of the same length never swap places.
+
+    Returns:
+        list: Placement of every ship, None if budget of backtracks was used up.
+
+    Raises:
+        ValueError: If every possibility was tried, so the ships can not be deployed.
+    """
+    sets = _CompatibleSets(catalogs, occupied, generator)
+    chosen = []  # (length, placement, log mark before the placement)
+    marks = []  # log mark at start of every depth, placements failed at the depth are removed after it
+    backtracks = 0
+    while len(chosen) < len(lengths):
+        depth = len(chosen)
+        if len(marks) == depth:
+            marks.append(len(sets.log))
+        # forward check, n ships need at least n compatible placements
+        if all(sets.size[length] >= count for length, count in needed[depth]):
+            length = lengths[depth]
+            placement = sets.pick(length)
+            chosen.append((length, placement, len(sets.log)))
+            for cell in catalogs[length].placement_cells(placement):
+                sets.remove_cell(cell)
+            continue
+        # dead end, moving previous ship somewhere else
+        sets.undo(marks.pop())
+        if not chosen:
+            raise ValueError("every possibility was tried")
+        backtracks += 1
+        if backtracks > budget:
+            return None
+        length, placement, mark = chosen.pop()
+        sets.undo(mark)
+        sets.remove(length, placement)
+    return [placement for _, placement, _ in chosen]
+
+
+def deploy_fleet(height, width, fleet, occupied=0, generator=random):
+    """
+    Choose random legal placements for every ship of a fleet.
+
+    Search backtracks when ships get stuck and starts over, with double budget, when backtracking
+    takes too long, as a few unlucky first ships can make the whole search slow.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        fleet (dict): Fleet dictionary (ship name -> {"Size", "Quantity", "Coordinates"}).
+        occupied (int): Bitmask of cells which can not be used. Default is 0.
+        generator: Source of random numbers, random module or random.Random. Default is random.
+
+    Returns:
+        list: List of (ship_name, row, column, alignment), one item per ship, biggest ships first.
+
+    Raises:
+        ValueError: If the fleet can not be deployed on the map.
+    """
+    ships = fleet_ships(fleet)
+    if not ships:
+        return []
+    lengths = [size for _, size in ships]
+    for ship_name, size in ships:
+        if size < 1 or size > max(height, width):
+            raise ValueError(f"{ship_name} of size {size} does not fit on {width}x{height} map.")
+    catalogs = {length: get_placement_catalog(height, width, length) for length in set(lengths)}
+
+    # needed[depth]: (length, number of ships) of ships not deployed yet at every depth
+    needed = []
+    counts = {}
+    for length in reversed(lengths):
+        counts[length] = counts.get(length, 0) + 1
+        needed.append(list(counts.items()))
+    needed.reverse()
+
+    budget = FIRST_ATTEMPT_BACKTRACKS
+    total = 0
+    while total <= MAX_BACKTRACKS:
+        try:
+            placements = _search(catalogs, lengths, needed, occupied, budget, generator)
+        except ValueError:
+            raise ValueError(f"Fleet of {len(ships)} ships can not be deployed on {width}x{height} map.") from None
+        if placements is not None:
+            return [(ship_name, *catalogs[size].placement(placement))
+                    for (ship_name, size), placement in zip(ships, placements)]
+        total += budget
+        budget *= 2
+    raise ValueError(f"Fleet of {len(ships)} ships was not deployed on {width}x{height} map "
+                     f"after {MAX_BACKTRACKS} backtracks.")
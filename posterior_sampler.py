@@ -0,0 +1,413 @@
+# battleship posterior_sampler.py - Monte Carlo CPU: samples fleet layouts agreeing with the hidden map
+#
+# Every sample is a full layout of ships still afloat which avoids misses and sunk ships and covers
+# every unsunk hit. The CPU shoots the untouched cell occupied in most samples. Samples are drawn by
+# a persistent process pool, under a time budget per move. Workers take placement tables from the
+# memory-mapped table cache (table_cache), so the pages of tables are shared by every process.
+#
+# Layouts are drawn by placing ships through unsunk hits first, then the other ships at random, so
+# samples follow the posterior approximately, not exactly.
+
+import atexit  # library to close the pool when the program ends
+import multiprocessing  # library to sample in worker processes
+import os  # library to find number of CPUs
+import random  # library to generate random
+import time  # library to keep time budget
+
+import board  # bitmask board layers
+import events  # event bus for tracing game actions
+import placement_catalog  # catalog of legal ship placements
+import table_cache  # disk cache of placement tables
+
+SAMPLES = 2000  # layouts sampled per move, at most
+TIME_BUDGET = 0.05  # seconds of sampling per move
+WORKERS = max(0, (os.cpu_count() or 1) - 1)  # worker processes, 0 samples in the game process
+PLACEMENT_TRIES = 100  # random placements tried for a ship before the sample is dropped
+
+_pool = None  # persistent process pool
+_pool_workers = 0  # number of processes of the pool
+
+
+def observations(game_map, symbol_layers):
+    """
+    Read cells of the hidden map as bitmasks, cell [row, column] is bit row * width + column.
+
+    Args:
+        game_map (list or Board): Hidden map the CPU is shooting at.
+        symbol_layers (dict): Symbol -> tuple of layer names, like SYMBOL_LAYERS, used for list maps.
+
+    Returns:
+        tuple: (shots, blocked, hits, sunk) bitmasks: every shot cell, misses and sunk ship cells,
+            hits on ships not sunk yet, sunk ship cells.
+    """
+    if isinstance(game_map, board.Board):
+        shots, hits, sunk = game_map.shots, game_map.hits, game_map.sunk
+    else:
+        shots = hits = sunk = 0
+        width = len(game_map[0])
+        for row, map_row in enumerate(game_map):
+            for column, value in enumerate(map_row):
+                bit = 1 << (row * width + column)
+                layers = symbol_layers.get(value, ())
+                shots |= bit if "shots" in layers else 0
+                hits |= bit if "hits" in layers else 0
+                sunk |= bit if "sunk" in layers else 0
+    return shots, shots & ~(hits & ~sunk), hits & ~sunk, sunk
+
+
+def _sample_layout(catalogs, lengths, blocked, hits, generator):
+    """
+    Draw a layout of ships of given lengths, avoiding blocked cells and covering every hit.
+
+    Returns:
+        list: Bitmask of every ship of the layout, None if the drawn ships got stuck.
+    """
+    ships = list(lengths)
+    layout = []
+    occupied = 0
+    uncovered = hits
+    while uncovered:
+        # some ship goes through the first uncovered hit
+        cell = (uncovered & -uncovered).bit_length() - 1
+        forbidden = blocked | occupied
+        options = []
+        weights = []
+        for length in set(ships):
+            catalog = catalogs[length]
+            for placement in catalog.covering(cell):
+                mask = catalog.mask(placement)
+                if not mask & forbidden:
+                    options.append((length, mask))
+                    weights.append(ships.count(length))
+        if not options:
+            return None
+        length, mask = generator.choices(options, weights)[0]
+        ships.remove(length)
+        layout.append(mask)
+        occupied |= mask
+        uncovered &= ~mask
+    for length in ships:
+        catalog = catalogs[length]
+        forbidden = blocked | occupied
+        for _ in range(PLACEMENT_TRIES):
+            mask = catalog.mask(generator.randrange(len(catalog)))
+            if not mask & forbidden:
+                layout.append(mask)
+                occupied |= mask
+                break
+        else:
+            return None
+    return layout
+
+
+def sample_layouts(height, width, lengths, blocked, hits, samples, time_budget, seed):
+    """
+    Draw layouts agreeing with observations, arguments are the same as of sample_occupancy.
+
+    Returns:
+        list: Sampled layouts, tuples of ship bitmasks.
+    """
+    deadline = time.perf_counter() + time_budget
+    generator = random.Random(seed)
+    catalogs = {length: placement_catalog.get_placement_catalog(height, width, length) for length in set(lengths)}
+    layouts = []
+    while len(layouts) < samples and time.perf_counter() < deadline:
+        layout = _sample_layout(catalogs, lengths, blocked, hits, generator)
+        if layout is not None:
+            layouts.append(tuple(layout))
+    return layouts
+
+
+def sample_occupancy(height, width, lengths, blocked, hits, samples, time_budget, seed):
+    """
+    Count how many sampled layouts occupy every cell.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        lengths (list): Lengths of ships afloat, one item per ship, biggest first.
+        blocked (int): Bitmask of cells which can not hold ships afloat (misses and sunk ships).
+        hits (int): Bitmask of hits on ships not sunk yet.
+        samples (int): Number of layouts to sample, at most.
+        time_budget (float): Seconds to sample for, at most.
+        seed (int): Seed of random.
+
+    Returns:
+        tuple: (counts, number of sampled layouts), counts[row * width + column] is number of layouts occupying the cell.
+    """
+    deadline = time.perf_counter() + time_budget
+    generator = random.Random(seed)
+    catalogs = {length: placement_catalog.get_placement_catalog(height, width, length) for length in set(lengths)}
+    counts = [0] * (height * width)
+    sampled = 0
+    while sampled < samples and time.perf_counter() < deadline:
+        layout = _sample_layout(catalogs, lengths, blocked, hits, generator)
+        if layout is None:
+            continue
+        sampled += 1
+        occupied = 0
+        for mask in layout:
+            occupied |= mask
+        occupied &= ~hits  # hit cells are not counted, they can not be shot again
+        while occupied:
+            lowest = occupied & -occupied
+            counts[lowest.bit_length() - 1] += 1
+            occupied ^= lowest
+    return counts, sampled
+
+
+def _sample_task(task):
+    """Worker task: load tables of the map and ship lengths from the table cache, then run sample_occupancy or sample_layouts."""
+    function, height, width, table_lengths, *arguments = task
+    table_cache.load_length_tables(height, width, table_lengths)
+    return function(height, width, *arguments)
+
+
+def get_pool(workers):
+    """Return persistent pool of worker processes, None when sampling has to stay in this process."""
+    global _pool, _pool_workers
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        return None  # pool workers can not start processes of their own
+    if _pool is None or _pool_workers != workers:
+        close_pool()
+        _pool = multiprocessing.Pool(workers)
+        _pool_workers = workers
+    return _pool
+
+
+def close_pool():
+    """Stop worker processes of the pool."""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+
+
+atexit.register(close_pool)
+
+
+def _run(function, height, width, table_fleet, lengths, blocked, hits, samples, time_budget, workers):
+    """
+    Run sample_occupancy or sample_layouts, samples are split across the pool when there is one.
+
+    Returns:
+        list: Results of every worker, one result when sampling stays in this process.
+    """
+    pool = get_pool(workers)
+    if pool is None:
+        return [function(height, width, lengths, blocked, hits, samples, time_budget, random.getrandbits(32))]
+    table_lengths = table_cache.ship_lengths(table_fleet)
+    tasks = [(function, height, width, table_lengths, lengths, blocked, hits, -(-samples // workers), time_budget,
+              random.getrandbits(32)) for _ in range(workers)]
+    return pool.map(_sample_task, tasks)
+
+
+def posterior_counts(height, width, fleet, table_fleet, blocked, hits, samples=SAMPLES,
+                     time_budget=TIME_BUDGET, workers=WORKERS):
+    """
+    Sample layouts of ships afloat across the pool, see sample_occupancy.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        fleet (dict): Fleet the CPU is shooting at, ships with quantity above zero are afloat.
+        table_fleet (dict): Fleet the table cache was loaded for, like DEFAULT_FLEET.
+        blocked (int): Bitmask of misses and sunk ship cells.
+        hits (int): Bitmask of hits on ships not sunk yet.
+        samples (int): Number of layouts to sample, at most. Default is SAMPLES.
+        time_budget (float): Seconds to sample for, at most. Default is TIME_BUDGET.
+        workers (int): Number of worker processes. Default is WORKERS.
+
+    Returns:
+        tuple: (counts, number of sampled layouts).
+    """
+    lengths = [size for _, size in placement_catalog.fleet_ships(fleet)]
+    counts = [0] * (height * width)
+    sampled = 0
+    for task_counts, task_sampled in _run(sample_occupancy, height, width, table_fleet, lengths, blocked, hits,
+                                          samples, time_budget, workers):
+        counts = [total + count for total, count in zip(counts, task_counts)]
+        sampled += task_sampled
+    return counts, sampled
+
+
+def best_cell(counts, shots, width):
+    """
+    Return the untouched cell occupied in most sampled layouts, ties are broken at random.
+
+    Returns:
+        tuple: (row, column), (None, None) if no untouched cell was occupied in any layout.
+    """
+    best_count = 0
+    best_cells = []
+    for cell, count in enumerate(counts):
+        if count < best_count or not count or shots >> cell & 1:
+            continue
+        if count > best_count:
+            best_count = count
+            best_cells = []
+        best_cells.append(cell)
+    if not best_cells:
+        return None, None
+    cell = random.choice(best_cells)
+    return cell // width, cell % width
+
+
+class ParticleFilter:
+    """
+    Sampled layouts kept between CPU moves (particles), for hard CPU.
+
+    After every move only particles contradicting the new shots are dropped, and the set is topped up
+    with new samples, so cost of a move grows with the number of dropped particles, not with the set size.
+    Particles are indexed by the cells they occupy and by their ship bitmasks, so dropped particles
+    are looked up instead of checking every particle, and cell counts are kept incrementally:
+        - a miss drops particles occupying the cell,
+        - a hit drops particles not occupying the cell (a set difference, done in C),
+        - a sunk ship drops particles holding another ship over its cells.
+    """
+
+    def __init__(self, game_map, symbol_layers, table_fleet, size=SAMPLES):
+        """
+        Args:
+            game_map (list or Board): Hidden map the CPU is shooting at.
+            symbol_layers (dict): Symbol -> tuple of layer names, like SYMBOL_LAYERS.
+            table_fleet (dict): Fleet the table cache was loaded for, like DEFAULT_FLEET.
+            size (int): Number of particles to keep. Default is SAMPLES.
+        """
+        self.game_map = game_map
+        self.symbol_layers = symbol_layers
+        self.table_fleet = table_fleet
+        self.size = size
+        self.height, self.width = len(game_map), len(game_map[0])
+        cell_count = self.height * self.width
+        self.catalogs = [placement_catalog.get_placement_catalog(self.height, self.width, length)
+                         for length in {ship_info["Size"] for ship_info in table_fleet.values()}]
+        self.particles = {}  # particle id -> tuple of ship bitmasks
+        self.next_id = 0
+        self.occupied = [set() for _ in range(cell_count)]  # cell -> ids of particles with a ship on the cell
+        self.ships = {}  # ship bitmask -> ids of particles holding a ship exactly there
+        self.counts = [0] * cell_count  # cell -> number of particles occupying the cell
+        self.shots = 0  # observations particles agree with
+        self.sunk = 0
+
+    def _add(self, layout):
+        """Add a particle, indexing its cells and ships."""
+        particle = self.next_id
+        self.next_id += 1
+        self.particles[particle] = layout
+        occupied = 0
+        for mask in layout:
+            occupied |= mask
+            self.ships.setdefault(mask, set()).add(particle)
+        while occupied:
+            lowest = occupied & -occupied
+            cell = lowest.bit_length() - 1
+            self.occupied[cell].add(particle)
+            self.counts[cell] += 1
+            occupied ^= lowest
+
+    def _drop(self, particle):
+        """Remove a particle and its index entries."""
+        layout = self.particles.pop(particle)
+        occupied = 0
+        for mask in layout:
+            occupied |= mask
+            self.ships[mask].discard(particle)
+        while occupied:
+            lowest = occupied & -occupied
+            cell = lowest.bit_length() - 1
+            self.occupied[cell].discard(particle)
+            self.counts[cell] -= 1
+            occupied ^= lowest
+
+    def observe(self, shots, blocked, sunk):
+        """
+        Drop particles contradicting shots made since the last observation.
+
+        Args:
+            shots (int): Bitmask of every shot cell.
+            blocked (int): Bitmask of misses and sunk ship cells.
+            sunk (int): Bitmask of sunk ship cells.
+
+        Returns:
+            int: Number of dropped particles.
+        """
+        if self.shots & ~shots or self.sunk & ~sunk:
+            lost = set(self.particles)  # map was reset, nothing is known about the particles
+        else:
+            lost = set()
+            misses = blocked & ~sunk
+            new_shots = shots & ~self.shots
+            while new_shots:
+                lowest = new_shots & -new_shots
+                cell = lowest.bit_length() - 1
+                if misses & lowest:
+                    lost.update(self.occupied[cell])
+                else:
+                    lost.update(self.particles.keys() - self.occupied[cell])
+                new_shots ^= lowest
+            new_sunk = sunk & ~self.sunk
+            if new_sunk:
+                # every cell of the sunk ship was hit, so particles left hold ships over it,
+                # those not holding exactly the sunk ship hold another ship overlapping it
+                for cell in range(len(self.counts)):
+                    if not new_sunk >> cell & 1:
+                        continue
+                    for catalog in self.catalogs:
+                        for placement in catalog.covering(cell):
+                            mask = catalog.mask(placement)
+                            if mask != new_sunk:
+                                lost.update(self.ships.get(mask, ()))
+        for particle in lost:
+            self._drop(particle)
+        self.shots, self.sunk = shots, sunk
+        return len(lost)
+
+    def top_up(self, fleet, blocked, hits, time_budget=TIME_BUDGET, workers=WORKERS):
+        """
+        Sample new particles agreeing with observations, until the set is full or time budget is spent.
+
+        Args:
+            fleet (dict): Fleet the CPU is shooting at, ships with quantity above zero are afloat.
+            blocked (int): Bitmask of misses and sunk ship cells.
+            hits (int): Bitmask of hits on ships not sunk yet.
+            time_budget (float): Seconds to sample for, at most. Default is TIME_BUDGET.
+            workers (int): Number of worker processes. Default is WORKERS.
+
+        Returns:
+            int: Number of added particles.
+        """
+        missing = self.size - len(self.particles)
+        if missing <= 0:
+            return 0
+        lengths = [size for _, size in placement_catalog.fleet_ships(fleet)]
+        if missing < workers * 64:
+            workers = 0  # few samples are drawn faster than tasks are sent to the pool
+        added = 0
+        for layouts in _run(sample_layouts, self.height, self.width, self.table_fleet, lengths, blocked, hits,
+                            missing, time_budget, workers):
+            for layout in layouts[:self.size - len(self.particles)]:
+                self._add(layout)
+                added += 1
+        return added
+
+    def update(self, fleet, time_budget=TIME_BUDGET, workers=WORKERS):
+        """
+        Bring particles up to date with the hidden map, then choose the cell occupied by most of them.
+
+        Args:
+            fleet (dict): Fleet the CPU is shooting at.
+            time_budget (float): Seconds to sample for, at most. Default is TIME_BUDGET.
+            workers (int): Number of worker processes. Default is WORKERS.
+
+        Returns:
+            tuple: (row, column), (None, None) if there are no particles.
+        """
+        start = time.perf_counter()
+        shots, blocked, hits, sunk = observations(self.game_map, self.symbol_layers)
+        dropped = self.observe(shots, blocked, sunk)
+        added = self.top_up(fleet, blocked, hits, max(0.0, time_budget - (time.perf_counter() - start)), workers)
+        events.debug("ParticleFilter.update", "{} particles dropped, {} added, {} kept",
+                     dropped, added, len(self.particles))
+        return best_cell(self.counts, shots, self.width)
@@ -0,0 +1,133 @@
+# battleship shot_index.py - incrementally kept index of cells shot by CPU and hits on ships not sunk yet
+
+# Cells are packed as row << 16 | column, same as ActionLog cells, so the index does not need the map size
+
+import board  # padded flat board of cell states
+import hit_clusters  # clusters of touching unsunk hits
+
+
+def pack(row, column):
+    """Return packed cell of coordinates."""
+    return row << 16 | column
+
+
+def unpack(cell):
+    """Return [row, column] of a packed cell."""
+    return [cell >> 16, cell & 0xFFFF]
+
+
+class ShotIndex:
+    """
+    Shot cells and unsunk hits, insert, delete and membership are O(1).
+
+    Hits keep the order they were made in, iterating the index yields [row, column] of every hit
+    not sunk yet, len() is their number, so the index is used like the hit log list it replaces.
+    Unsunk hits are also grouped into clusters of touching cells (clusters attribute, HitClusters).
+    When map size is known, cell states are kept on a PaddedBoard too (grid attribute, sparse for very
+    large maps, see board.make_padded_board), so neighbours of cells are checked without bounds checks.
+    Indexes made without map size get their grid from attach_grid.
+    """
+
+    def __init__(self, shots=(), hits=(), height=None, width=None):
+        """
+        Args:
+            shots (iterable): Coordinates [row, column] of shot cells. Default is empty.
+            hits (iterable): Coordinates [row, column] of hits on ships not sunk yet. Default is empty.
+            height (int): Height of the map, grid is kept only when map size is given. Default is None.
+            width (int): Width of the map. Default is None.
+        """
+        self.shots = {pack(row, column) for row, column in shots}  # packed shot cells
+        self.hits = dict.fromkeys(pack(row, column) for row, column in hits)  # packed unsunk hits, oldest first
+        self.clusters = hit_clusters.HitClusters()
+        self.grid = None  # FREE, SHOT or HIT of every cell, see attach_grid
+        for cell in self.hits:
+            self.clusters.add(cell >> 16, cell & 0xFFFF)
+        if height is not None:
+            self.attach_grid(height, width)
+
+    def attach_grid(self, height, width):
+        """
+        Start keeping cell states on a padded grid of map size, filled from shots and hits of the index.
+
+        Returns:
+            PaddedBoard: The grid.
+        """
+        self.grid = board.make_padded_board(height, width)
+        for cell in self.shots:
+            self._set_grid(cell, board.SHOT)
+        for cell in self.hits:
+            self._set_grid(cell, board.HIT)
+        return self.grid
+
+    def _set_grid(self, cell, state):
+        """Set grid state of a packed cell, when grid is kept."""
+        if self.grid is not None:
+            self.grid.set(cell >> 16, cell & 0xFFFF, state)
+
+    def add_shot(self, row, column):
+        """Mark the cell as shot."""
+        cell = row << 16 | column
+        self.shots.add(cell)
+        self._set_grid(cell, board.SHOT)
+
+    def is_shot(self, row, column):
+        """Check if the cell was shot."""
+        return row << 16 | column in self.shots
+
+    def unshot(self, coordinates):
+        """Return coordinates [row, column] of a list which were not shot, in list order."""
+        shots = self.shots
+        return [cell for cell in coordinates if cell[0] << 16 | cell[1] not in shots]
+
+    def add_hit(self, row, column):
+        """Mark the cell as shot and as hit on a ship not sunk yet."""
+        cell = row << 16 | column
+        self.shots.add(cell)
+        self.hits[cell] = None
+        self._set_grid(cell, board.HIT)
+        self.clusters.add(row, column)
+
+    def remove_hits(self, coordinates):
+        """
+        Forget hits of a sunk ship, they are peeled off their clusters too.
+
+        Args:
+            coordinates (list): Coordinates [row, column] of the ship.
+
+        Returns:
+            int: Number of ship cells which were not in the hits.
+        """
+        missing = 0
+        hits = self.hits
+        for row, column in coordinates:
+            cell = row << 16 | column
+            if cell in hits:
+                del hits[cell]
+                self._set_grid(cell, board.SHOT)
+            else:
+                missing += 1
+        self.clusters.remove(coordinates)
+        return missing
+
+    def hit_list(self):
+        """Return list of [row, column] of unsunk hits, oldest first."""
+        return [unpack(cell) for cell in self.hits]
+
+    def __len__(self):
+        return len(self.hits)
+
+    def __iter__(self):
+        for cell in self.hits:
+            yield unpack(cell)
+
+    def __repr__(self):
+        return repr(self.hit_list())
+
+    def copy(self):
+        """Return an independent copy of the index."""
+        index = ShotIndex()
+        index.shots = set(self.shots)
+        index.hits = dict(self.hits)
+        index.clusters = self.clusters.copy()
+        index.grid = self.grid.copy() if self.grid is not None else None
+        return index
@@ -0,0 +1,109 @@
+# battleship simulate.py - headless CPU vs CPU simulations, many games across worker processes
+# Usage example: python simulate.py --games 1000 --workers 8 --output simulation_results.jsonl
+
+import argparse  # library to read command line arguments
+import json  # library to write results file
+import multiprocessing  # library to play games in worker processes
+import os  # library to find number of CPUs
+import random  # library to generate random
+import statistics  # library to summarize results
+import time  # library to measure turn times
+
+import action_log  # outcome codes of logged game actions
+import game_loader  # loads CPU vs CPU game code by path
+
+game = game_loader.load_game()  # CPU vs CPU game code (test.py)
+
+
+def play_game(seed):
+    """
+    Play a single CPU vs CPU game without printing anything, game events are traced only when a sink is added.
+
+    Args:
+        seed (int): Seed of random, same seed plays the same game.
+
+    Returns:
+        dict: Game results:
+            - seed (int): Seed of the game.
+            - finished (bool): True if every ship was sunk.
+            - shots (int): Number of shots made.
+            - turn_times_ns (list): Time of every CPU turn (choosing coordinates and shooting) in nanoseconds.
+            - kill_order (list): Names of sunk ships, in the order they were sunk.
+    """
+    random.seed(seed)
+    turn_times_ns = []
+    game.new_cpu_game()
+    max_turns = game.MAP_HEIGHT * game.MAP_WIDTH * 2  # safety limit, in case CPU gets stuck
+    while game.fleet_cpu and len(turn_times_ns) < max_turns:
+        turn_start = time.perf_counter_ns()
+        game.cpu_move()
+        turn_times_ns.append(time.perf_counter_ns() - turn_start)
+    kill_order = game.game_actions_log.ships_with_outcome(action_log.SUNK)
+    return {
+        "seed": seed,
+        "finished": not game.fleet_cpu,
+        "shots": len(turn_times_ns),
+        "turn_times_ns": turn_times_ns,
+        "kill_order": kill_order,
+    }
+
+
+def set_difficulty(difficulty):
+    """Set CPU difficulty of games played in this process, used as pool initializer."""
+    game.CPU_DIFFICULTY = difficulty
+
+
+def run_simulations(games, workers, seed, output_path, difficulty="normal"):
+    """
+    Play many games across a process pool and write results to a file, one JSON line per game.
+
+    Args:
+        games (int): Number of games to play.
+        workers (int): Number of worker processes.
+        seed (int): Seed of the first game, every next game uses next seed.
+        output_path (str): Path of the results file.
+        difficulty (str): CPU difficulty, "normal" or "hard". Default is "normal".
+
+    Returns:
+        list: Results of every game, see play_game.
+    """
+    seeds = range(seed, seed + games)
+    chunk_size = max(1, games // (workers * 8))  # few chunks per worker keep all workers busy
+    results = []
+    with multiprocessing.Pool(workers, set_difficulty, (difficulty,)) as pool, open(output_path, "w") as output_file:
+        for result in pool.imap_unordered(play_game, seeds, chunksize=chunk_size):
+            output_file.write(json.dumps(result) + "\n")
+            results.append(result)
+    results.sort(key=lambda result: result["seed"])
+    return results
+
+
+def print_summary(results):
+    """Print number of games, shots to win and turn times of simulation results."""
+    finished = [result for result in results if result["finished"]]
+    turn_times = [turn_time for result in results for turn_time in result["turn_times_ns"]]
+    print(f"Games played: {len(results)}, finished: {len(finished)}")
+    if finished:
+        shots = [result["shots"] for result in finished]
+        print(f"Shots to win: mean {statistics.mean(shots):.2f}, min {min(shots)}, max {max(shots)}")
+    if turn_times:
+        print(f"Turn time: mean {statistics.mean(turn_times) / 1000:.1f} us, "
+              f"max {max(turn_times) / 1000:.1f} us")
+
+
+def main():
+    """Read command line arguments and run simulations."""
+    parser = argparse.ArgumentParser(description="Play headless CPU vs CPU battleship games.")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--difficulty", choices=("normal", "hard"), default="normal", help="CPU difficulty")
+    parser.add_argument("--output", default="simulation_results.jsonl", help="results file, one JSON line per game")
+    arguments = parser.parse_args()
+    results = run_simulations(arguments.games, arguments.workers, arguments.seed, arguments.output,
+                              arguments.difficulty)
+    print_summary(results)
+
+
+if __name__ == "__main__":
+    main()
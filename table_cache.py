@@ -0,0 +1,196 @@
+# battleship table_cache.py - on-disk cache of precomputed map tables, loaded with mmap
+#
+# Tables depend only on map size and ship lengths of the fleet, so they are built once and stored in
+# CACHE_DIRECTORY, one file per (height, width, ship lengths). Loading maps the file into memory,
+# tables are memoryviews over the mapped pages, so they load at once and worker processes
+# share the same pages.
+#
+# File format (native byte order, file name holds the format version):
+#     MAGIC, VERSION (uint32), directory size (uint32), directory as JSON, then table data,
+#     every table aligned to TABLE_ALIGNMENT bytes. Directory holds height, width, ship lengths
+#     and table name -> [offset, typecode, number of items].
+# Tables:
+#     "<length>.<name>": placement catalog tables of every ship length in the fleet (see build_catalog_tables),
+#                        "<length>.fit_counts" is the window fit table, placements through every cell
+
+import array  # library for typed tables
+import hashlib  # library to name cache files by ship lengths
+import json  # library to write table directory
+import mmap  # library to map cache files into memory
+import os  # library to find and replace cache files
+import struct  # library to pack file header
+import tempfile  # library to write cache files atomically
+
+import events  # event bus for tracing
+import placement_catalog  # catalog of legal ship placements
+
+VERSION = 2  # increased on every change of tables or file format, old files are ignored
+MAGIC = b"BSTABLES"
+HEADER_FORMAT = "=8sII"  # magic, version, directory size
+TABLE_ALIGNMENT = 8
+CACHE_DIRECTORY = os.environ.get("BATTLESHIP_TABLE_CACHE",
+                                 os.path.join(os.path.expanduser("~"), ".cache", "battleship"))
+
+_loaded = {}  # (height, width, ship lengths) -> GameTables
+
+
+class GameTables:
+    """
+    Tables of a map size and fleet.
+
+    Attributes:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        lengths (tuple): Distinct ship lengths, ascending, see ship_lengths.
+        catalogs (dict): Ship length -> PlacementCatalog, also registered in placement_catalog.
+        path (str): Path of the cache file, None when tables are kept only in memory.
+    """
+
+    def __init__(self, height, width, lengths, tables, path=None, buffer=None):
+        self.height = height
+        self.width = width
+        self.lengths = lengths
+        self.path = path
+        self._buffer = buffer  # memory map, kept open while tables are used
+        self.catalogs = {}
+        for length in lengths:
+            catalog_tables = {name: tables[f"{length}.{name}"] for name in placement_catalog.CATALOG_TABLES}
+            self.catalogs[length] = placement_catalog.PlacementCatalog(height, width, length, catalog_tables)
+
+    def register(self):
+        """Make placement_catalog use these catalogs."""
+        for catalog in self.catalogs.values():
+            placement_catalog.register_placement_catalog(catalog)
+
+
+def ship_lengths(fleet):
+    """Return distinct ship lengths of a fleet, ascending, tables depend on nothing else of the fleet."""
+    return tuple(sorted({ship_info["Size"] for ship_info in fleet.values()}))
+
+
+def build_tables(height, width, lengths):
+    """Build every table of a map size and ship lengths, returns table name -> typed array."""
+    tables = {}
+    for length in lengths:
+        for name, table in placement_catalog.build_catalog_tables(height, width, length).items():
+            tables[f"{length}.{name}"] = table
+    return tables
+
+
+def cache_path(height, width, lengths, directory=None):
+    """Return path of the cache file of a map size and ship lengths."""
+    digest = hashlib.sha1(json.dumps(lengths).encode()).hexdigest()[:16]
+    return os.path.join(directory or CACHE_DIRECTORY, f"tables_v{VERSION}_{height}x{width}_{digest}.bin")
+
+
+def write_tables(path, height, width, lengths, tables):
+    """Write tables to a cache file, other processes see either no file or the whole file."""
+    directory = {"height": height, "width": width, "lengths": lengths, "tables": {}}
+    offset = 0
+    for name, table in tables.items():
+        directory["tables"][name] = [offset, table.typecode, len(table)]
+        offset += -(-len(table) * table.itemsize // TABLE_ALIGNMENT) * TABLE_ALIGNMENT
+    directory_json = json.dumps(directory).encode()
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(directory_json)) + directory_json
+    data_start = -(-len(header) // TABLE_ALIGNMENT) * TABLE_ALIGNMENT
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(header.ljust(data_start, b"\0"))
+            for name, table in tables.items():
+                file.seek(data_start + directory["tables"][name][0])
+                table.tofile(file)
+            file.truncate(data_start + offset)
+        os.chmod(temporary_path, 0o644)  # readable by every process, like files written with open
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def read_tables(path, height, width, lengths):
+    """
+    Map a cache file into memory.
+
+    Returns:
+        GameTables: Tables backed by the mapped file, None if the file is missing, of other version or for other map.
+    """
+    try:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    header_size = struct.calcsize(HEADER_FORMAT)
+    if len(buffer) < header_size:
+        buffer.close()
+        return None
+    magic, version, directory_size = struct.unpack_from(HEADER_FORMAT, buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        buffer.close()
+        return None
+    directory = json.loads(buffer[header_size:header_size + directory_size])
+    if (directory["height"], directory["width"]) != (height, width) or \
+            tuple(directory["lengths"]) != tuple(lengths):
+        buffer.close()
+        return None
+    data_start = -(-(header_size + directory_size) // TABLE_ALIGNMENT) * TABLE_ALIGNMENT
+    view = memoryview(buffer)
+    tables = {}
+    for name, (offset, typecode, count) in directory["tables"].items():
+        start = data_start + offset
+        tables[name] = view[start:start + count * array.array(typecode).itemsize].cast(typecode)
+    return GameTables(height, width, lengths, tables, path, buffer)
+
+
+def load_tables(height, width, fleet, directory=None):
+    """
+    Return tables of a map size and fleet, see load_length_tables.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        fleet (dict): Fleet dictionary, only ship sizes are used.
+        directory (str): Cache directory. Default is CACHE_DIRECTORY.
+
+    Returns:
+        GameTables: Tables of the map and fleet.
+    """
+    return load_length_tables(height, width, ship_lengths(fleet), directory)
+
+
+def load_length_tables(height, width, lengths, directory=None):
+    """
+    Return tables of a map size and ship lengths, mapped from the cache file, which is built first if it is missing.
+    Placement catalogs of the tables are registered, so deployment and CPU targeting use them.
+
+    Tables are kept in memory only, when the cache directory can not be written.
+
+    Args:
+        height (int): Height of the map.
+        width (int): Width of the map.
+        lengths (tuple): Distinct ship lengths, ascending, see ship_lengths.
+        directory (str): Cache directory. Default is CACHE_DIRECTORY.
+
+    Returns:
+        GameTables: Tables of the map and ship lengths.
+    """
+    lengths = tuple(lengths)
+    key = (height, width, lengths)
+    if key not in _loaded:
+        path = cache_path(height, width, lengths, directory)
+        game_tables = read_tables(path, height, width, lengths)
+        if game_tables is None:
+            tables = build_tables(height, width, lengths)
+            try:
+                write_tables(path, height, width, lengths, tables)
+                game_tables = read_tables(path, height, width, lengths)
+            except OSError as error:
+                events.warning("load_tables", "table cache {} was not written: {}", path, error)
+            if game_tables is None:
+                game_tables = GameTables(height, width, lengths, tables)
+            events.info("load_tables", "built tables of {}x{} map", width, height)
+        _loaded[key] = game_tables
+    _loaded[key].register()
+    return _loaded[key]
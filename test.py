@@ -2,9 +2,19 @@
 
 # Import required libraries
 import random  # library to generate random
-import copy  # library to make copies of lists and etc, will use function deepcopy
 import os  # library to clear terminal
 import time  # importing time library for logging game actions
+import map_search  # fast search of empty patterns on maps
+import board  # bitmask board with the same indexing as maps
+import cpu_targeting  # CPU targeting engines
+import fleet_model  # fleet dictionary with index of ship cells and ship health
+import events  # event bus for tracing game actions, instead of printing
+import action_log  # compact columnar log of game actions
+import layout_sampler  # uniformly random fleet layouts
+import table_cache  # disk cache of placement tables
+import game_state  # game state copies with undo, for CPU lookahead
+import shot_index  # index of CPU shots and unsunk hits
+import posterior_sampler  # Monte Carlo sampling of fleet layouts, for hard CPU
 
 # Constants for map dimensions and default symbol
 MAP_HEIGHT = 10
@@ -20,9 +30,13 @@ map_player = [[DEFAULT_SYMBOL for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIG
 # Initialize game-related variables
 start_time = time.time()  # starting timer, later it will reset with game start
 game_result = None  # Store the game result (win, lose, or draw)
-cpu_shot_log_tmp = []  # List to store CPU actions (coordinates) if HIT [row, column]
-game_actions_log = [
-    ["player or CPU", "time", "column", "row", "action outcome"]]  # List to store CPU's shot coordinates
+cpu_shot_log_tmp = shot_index.ShotIndex(height=MAP_HEIGHT, width=MAP_WIDTH)  # CPU shot cells, and hits [row, column] of ships not sunk yet
+cpu_density = None  # placement-count heatmap of CPU hunt phase, created with game
+CPU_HUNT_STRATEGY = "density"  # how CPU hunts for ships: "density", "parity" or "biggest_ship"
+CPU_DIFFICULTY = "normal"  # "normal" hunts and targets as above, "hard" samples fleet layouts agreeing with the hidden map
+CPU_POSTERIOR_MODE = "particles"  # hard CPU: "particles" keeps sampled layouts between moves, "resample" samples anew every move
+cpu_particles = None  # layouts kept between moves of hard CPU, created with game
+game_actions_log = action_log.ActionLog()  # Columnar log of every shot and its outcome
 
 
 def clear_terminal():
@@ -42,8 +56,13 @@ def initialize_maps(width, height, default_symbol):
         default_symbol (str): The default symbol to populate the map.
 
     Returns:
-        list: A 2D list filled with the default symbol.
+        list: A 2D list filled with the default symbol, NumPy ArrayBoard for big maps when NumPy
+        is installed, or TiledBoard for very large maps.
     """
+    if width * height >= board.TILED_MIN_CELLS or (map_search.np is not None and width * height >= map_search.NUMPY_MIN_CELLS):
+        # sparse board for very large maps, chunks are allocated only where ships and shots are,
+        # vectorized array board for big maps
+        return board.make_board(width, height, default_symbol, SYMBOL_LAYERS)
     return [[default_symbol for _ in range(height)] for _ in range(width)]
 
 
@@ -58,21 +77,33 @@ DEFAULT_FLEET = {
 }
 
 
-def print_fleet(fleet):
-    """Print the fleet information in a formatted manner.
+def format_fleet(fleet):
+    """Format the fleet information as a table.
 
     Args:
         fleet (dict): Dictionary containing fleet information.
+
+    Returns:
+        str: Table of ship types, sizes, quantities and coordinates.
     """
-    print("{:<20} {:<10} {:<10} {:<50}".format(
-        "ShipType", "Size", "Quantity", "Coordinates"))
-    print("=" * 40)
+    lines = ["{:<20} {:<10} {:<10} {:<50}".format(
+        "ShipType", "Size", "Quantity", "Coordinates"), "=" * 40]
     for ship, ship_details in fleet.items():
         size = ship_details["Size"]
         quantity = ship_details["Quantity"]
         coordinates = str(ship_details["Coordinates"])  # Convert the list to a string
-        print("{:<20} {:<10} {:<10} {:<50}".format(
+        lines.append("{:<20} {:<10} {:<10} {:<50}".format(
             ship, size, quantity, coordinates))
+    return "\n".join(lines)
+
+
+def print_fleet(fleet):
+    """Print the fleet information in a formatted manner.
+
+    Args:
+        fleet (dict): Dictionary containing fleet information.
+    """
+    print(format_fleet(fleet))
 
 
 # Define color dictionary
@@ -109,6 +140,24 @@ SHIP_SYMBOLS = {
     ],
 }
 
+# Board layers (ships, shots, hits, sunk) of every ship symbol
+SYMBOL_LAYERS = board.symbol_layers_from_ship_symbols(SHIP_SYMBOLS)
+
+
+def initialize_board(height, width, default_symbol):
+    """Initialize a bitmask board, it is used same as 2D map, but keeps version and caches pattern searches.
+
+    Args:
+        height (int): The height of the board.
+        width (int): The width of the board.
+        default_symbol (str): The default symbol of untouched cells.
+
+    Returns:
+        Board: A board filled with the default symbol, TiledBoard for very large maps.
+    """
+    global SYMBOL_LAYERS
+    return board.make_board(height, width, default_symbol, SYMBOL_LAYERS)
+
 
 def print_map(game_map):
     """Print the game map.
@@ -244,6 +293,9 @@ def map_show_ship_or_symbols(game_map, length, coordinates, alignment, ship_name
 
     # Store the coordinates of the deployed ship in the fleet dictionary
     fleet[ship_name]["Coordinates"].append(ship_coordinates)
+    # Index ship cells, so the ship is found by coordinates without scanning the fleet
+    if isinstance(fleet, fleet_model.IndexedFleet):
+        fleet.index_ship(ship_name, len(fleet[ship_name]["Coordinates"]) - 1, ship_coordinates)
 
     return game_map
 
@@ -264,38 +316,14 @@ def search_map_for_pattern(game_map, height, width):
         List[Tuple[int, int]]: A list of coordinates (row, col) where the pattern is found, or an empty list if no pattern is found.
     """
 
-    # Create a pattern of DEFAULT_SYMBOL with the given height and width
     global DEFAULT_SYMBOL
-    pattern = [[DEFAULT_SYMBOL for _ in range(width)] for _ in range(height)]
-
-    # Get the dimensions of the map
-    map_height, map_width = len(game_map), len(game_map[0])
-
-    # Initialize an empty list to store the coordinates where the pattern is found
-    coordinates = []
-
-    # Loop through the map to find occurrences of the pattern
-    for row in range(map_height - height + 1):
-        for col in range(map_width - width + 1):
-            pattern_matches = True  # Assume the pattern matches until proven otherwise
-
-            # Check each cell in the subgrid against the pattern
-            for i in range(height):
-                for j in range(width):
-                    if game_map[row + i][col + j] != pattern[i][j]:
-                        pattern_matches = False
-                        break  # Break the inner loop if any cell doesn't match
-                if not pattern_matches:
-                    break  # Break the outer loop if any row doesn't match
-
-            # If the pattern matches, add the top-left corner coordinates to the list
-            if pattern_matches:
-                coordinates.append([row, col])
+    # Every window is tested in O(1), using board bitmasks or summed-area table of touched cells
+    coordinates = map_search.find_pattern(game_map, height, width, DEFAULT_SYMBOL)
     if len(coordinates) == 0:
-        print("no coordinates found on function search_map_for_pattern")
+        events.debug("search_map_for_pattern", "no coordinates found on function search_map_for_pattern")
         return "noneFound"
     else:
-        print("YAY coordinates found on function search_map_for_pattern", coordinates)
+        events.debug("search_map_for_pattern", "YAY coordinates found on function search_map_for_pattern {}", coordinates)
         return coordinates
 
 
@@ -316,6 +344,9 @@ def cpu_deploy_all_ships():
 
     Returns:
         None
+
+    Raises:
+        ValueError: If the fleet can not be deployed on the map.
     """
 
     # Declare global variables
@@ -324,28 +355,16 @@ def cpu_deploy_all_ships():
     # Initialize the map with default symbols if not already done
     map_cpu_display = initialize_maps(MAP_HEIGHT, MAP_WIDTH, DEFAULT_SYMBOL)
 
-    # Make a deep copy of the default fleet to initialize fleet_cpu
-    fleet_cpu = copy.deepcopy(DEFAULT_FLEET)
-
-    # Loop through each ship type in the fleet
-    for ship_name, ship_info in fleet_cpu.items():
-        quantity = ship_info["Quantity"]  # Number of ships of this type
-        size = ship_info["Size"]  # Size of this type of ship
-        # Deploy the required number of each ship type
-        location = ""
-        for i in range(quantity):
-            # Determine alignment and find a suitable location for the ship
-            if size == 1:
-                alignment = "Single"
-                location = random.choice(search_map_for_pattern(map_cpu_display, 1, 1))
-            else:
-                alignment = random.choice(["Horizontal", "Vertical"])  # Randomly choose alignment
-                if alignment == "Vertical":
-                    location = random.choice(search_map_for_pattern(map_cpu_display, size, 1))
-                elif alignment == "Horizontal":
-                    location = random.choice(search_map_for_pattern(map_cpu_display, 1, size))
-                    # Deploy the ship and update the map and fleet information
-            map_show_ship_or_symbols(map_cpu_display, size, location, alignment, ship_name, fleet_cpu)
+    # Copy ship types of the default fleet to initialize fleet_cpu, it will keep index of ship cells and their health
+    fleet_cpu = fleet_model.IndexedFleet.from_fleet(DEFAULT_FLEET)
+
+    # Choose uniformly random layout of the whole fleet, ValueError is raised if the fleet does not fit
+    placements = layout_sampler.sample_layout(MAP_HEIGHT, MAP_WIDTH, fleet_cpu)
+
+    # Deploy every ship and update the map and fleet information
+    for ship_name, row, column, alignment in placements:
+        size = fleet_cpu[ship_name]["Size"]  # Size of this type of ship
+        map_show_ship_or_symbols(map_cpu_display, size, [row, column], alignment, ship_name, fleet_cpu)
 
 
 def find_biggest_ship_in_fleet(fleet):
@@ -362,6 +381,12 @@ def find_biggest_ship_in_fleet(fleet):
         None: If there are no ships with a quantity greater than 0.
     """
 
+    # Fleet keeping sorted sizes of ships afloat knows the biggest ship at once
+    if isinstance(fleet, fleet_model.IndexedFleet):
+        biggest = fleet.ship_sizes.biggest_ship()
+        events.debug("find_biggest_ship_in_fleet", "Biggest ship: {}", biggest)
+        return biggest
+
     # Filter out ships with zero quantity
     available_ships = {k: v for k, v in fleet.items() if v["Quantity"] > 0}
 
@@ -373,14 +398,13 @@ def find_biggest_ship_in_fleet(fleet):
     biggest_ship = max(available_ships, key=lambda ship: available_ships[ship]["Size"])
     biggest_ship_size = available_ships[biggest_ship]["Size"]
 
-    print(f"Biggest ship: {biggest_ship}, Size: {biggest_ship_size}")
+    events.debug("find_biggest_ship_in_fleet", "Biggest ship: {}, Size: {}", biggest_ship, biggest_ship_size)
 
     return biggest_ship, biggest_ship_size
 
 
 def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search):
-    print()
-    print("initializing function cpu_choose_shooting_coordinates_biggest_ship")
+    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "initializing function cpu_choose_shooting_coordinates_biggest_ship")
     """
     Choose shooting coordinates for the CPU based on the biggest ship in the fleet.
     Args:
@@ -395,7 +419,7 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
     height = ""
     width = ""
     if ship_name is None:
-        print("game over print")  # need to create function game over, as no ships left in fleet
+        events.debug("cpu_choose_shooting_coordinates_biggest_ship", "game over print")  # need to create function game over, as no ships left in fleet
     else: # there are remaining ships in fleet
         width = ship_size * 2 - 1
         height = ship_size * 2 - 1
@@ -404,10 +428,10 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
             while coordinates == "noneFound":
                 coordinates = search_map_for_pattern(map_to_search, height,width)  # getting list of possible coordinates
                 if coordinates != "noneFound": # yay, we have found coordinates
-                    print("cpu_choose_shooting_coordinates_biggest_ship found coordinates   ", coordinates)
+                    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "cpu_choose_shooting_coordinates_biggest_ship found coordinates    {}", coordinates)
                     break
                 reduction = random.choice(["height", "width"])
-                print("we have found no coordinates with height and width: ", height, width)
+                events.debug("cpu_choose_shooting_coordinates_biggest_ship", "we have found no coordinates with height and width:  {} {}", height, width)
                 if reduction == "height":
                     height, width, coordinates = map_search_reduce_height(height, width, map_to_search)
                     if coordinates != "noneFound":
@@ -417,28 +441,88 @@ def cpu_choose_shooting_coordinates_biggest_ship(fleet_to_search, map_to_search)
                     if coordinates != "noneFound":
                         break
                 if (height < ship_size) and (width <= 1):
-                    print("we have found no coordinates with height and width: ", height, width)
+                    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "we have found no coordinates with height and width:  {} {}", height, width)
                     break
                 if (height <= 1) and (width < ship_size) :
-                    print("we have found no coordinates with height and width: ", height, width)
+                    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "we have found no coordinates with height and width:  {} {}", height, width)
                     break
                 if height < 1 or width < 1:
-                    print("we have found no coordinates with height and width: ", height, width)
+                    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "we have found no coordinates with height and width:  {} {}", height, width)
                     break
     chosen_coordinates = random.choice(coordinates)
     if len(chosen_coordinates) != 2:
-        print(f"Error: chosen_coordinates contains {len(chosen_coordinates)} values, expected 2.")
+        events.warning("cpu_choose_shooting_coordinates_biggest_ship", "Error: chosen_coordinates contains {} values, expected 2.", len(chosen_coordinates))
         return None, None  # or however you wish to handle this case
     # loop is over, coordinates are found
     coord_row, coord_column = chosen_coordinates  # now we k# now coordinates last pattern was used, so based on that, we will take sweet spot - center of pattern and shoot
-    print("coordinates befoew selecting senter of pattern: ", coord_row, coord_column, "height and width: ", height, width)
+    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "coordinates befoew selecting senter of pattern:  {} {} height and width:  {} {}", coord_row, coord_column, height, width)
     middle_width = (width // 2) + random.choice([1, width % 2]) - 1
     middle_height = (height // 2) + random.choice([1, height % 2]) - 1
-    print("just checking for middle of width and height:", middle_height, middle_width)
+    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "just checking for middle of width and height: {} {}", middle_height, middle_width)
     coordinate_column = coord_column + middle_width
     coordinate_row = coord_row + middle_height
 
-    print("coordinate_x, coordinate_y", coordinate_row, coordinate_column)
+    events.debug("cpu_choose_shooting_coordinates_biggest_ship", "coordinate_x, coordinate_y {} {}", coordinate_row, coordinate_column)
+    return coordinate_row, coordinate_column
+
+
+def cpu_choose_shooting_coordinates_density(fleet_to_search, map_to_search):
+    """
+    Choose shooting coordinates for the CPU hunt phase, cell covered by most legal placements
+    of all remaining ships.
+
+    Args:
+        fleet_to_search (dict): Fleet the CPU is shooting at.
+        map_to_search (list): The map to search for shooting coordinates (hidden map).
+
+    Global Variables:
+        cpu_density (PlacementDensity): Heatmap, updated incrementally between turns.
+
+    Returns:
+        The chosen shooting coordinates (row, column).
+    """
+    global cpu_density, DEFAULT_SYMBOL
+    # new map (new game) needs new heatmap
+    if cpu_density is None or cpu_density.game_map is not map_to_search:
+        cpu_density = cpu_targeting.PlacementDensity(map_to_search, DEFAULT_SYMBOL)
+    cpu_density.sync_fleet(fleet_to_search)
+    cpu_density.sync_map()
+    coordinate_row, coordinate_column = cpu_density.best_cell()
+    events.debug("cpu_choose_shooting_coordinates_density", "cpu_choose_shooting_coordinates_density coordinates: {} {}", coordinate_row, coordinate_column)
+    return coordinate_row, coordinate_column
+
+
+def cpu_choose_shooting_coordinates_parity(fleet_to_search, map_to_search):
+    """
+    Choose shooting coordinates for the CPU hunt phase on a checkerboard-like lattice: cells with
+    (row + column) % k == residue, k is the size of the smallest ship left, so every ship covers a lattice cell.
+    Among lattice cells the one covered by most legal placements of all remaining ships is chosen.
+
+    Args:
+        fleet_to_search (dict): Fleet the CPU is shooting at.
+        map_to_search (list): The map to search for shooting coordinates (hidden map).
+
+    Global Variables:
+        cpu_density (PlacementDensity): Heatmap, updated incrementally between turns, keeps the lattice.
+
+    Returns:
+        The chosen shooting coordinates (row, column).
+    """
+    global cpu_density, DEFAULT_SYMBOL
+    # new map (new game) needs new heatmap
+    if cpu_density is None or cpu_density.game_map is not map_to_search:
+        cpu_density = cpu_targeting.PlacementDensity(map_to_search, DEFAULT_SYMBOL)
+    cpu_density.sync_fleet(fleet_to_search)
+    cpu_density.sync_map()
+    # Fleet keeping sorted sizes of ships afloat knows the smallest ship at once
+    if isinstance(fleet_to_search, fleet_model.IndexedFleet):
+        spacing = fleet_to_search.ship_sizes.smallest()
+    else:
+        spacing = min((ship_info["Size"] for ship_info in fleet_to_search.values() if ship_info["Quantity"] > 0), default=None)
+    if spacing is None:
+        return cpu_density.best_cell()
+    coordinate_row, coordinate_column = cpu_density.best_lattice_cell(spacing)
+    events.debug("cpu_choose_shooting_coordinates_parity", "lattice {} coordinates: {} {}", cpu_density.lattice, coordinate_row, coordinate_column)
     return coordinate_row, coordinate_column
 
 
@@ -446,12 +530,12 @@ def map_search_reduce_width(height, width, map_to_search):
     width -= 1  # reducing width
     coordinates = search_map_for_pattern(map_to_search, height, width)
     if coordinates == "noneFound":
-        print("we have found no coordinates with height and width: ", height, width)
+        events.debug("map_search_reduce_width", "we have found no coordinates with height and width:  {} {}", height, width)
         width += 1  # restoring width
         height -= 1  # reducing height
         coordinates = search_map_for_pattern(map_to_search, height, width)
         if coordinates == "noneFound":
-            print("we have found no coordinates with height and width: ", height, width)
+            events.debug("map_search_reduce_width", "we have found no coordinates with height and width:  {} {}", height, width)
             width -= 1  # reducing width, so now both height and width are deduced by 1
     return height, width, coordinates
 
@@ -460,12 +544,12 @@ def map_search_reduce_height(height, width, map_to_search):
     height -= 1  # reducing height
     coordinates = search_map_for_pattern(map_to_search, height, width)
     if coordinates == "noneFound":
-        print("we have found no coordinates with height and width: ", height, width)
+        events.debug("map_search_reduce_height", "we have found no coordinates with height and width:  {} {}", height, width)
         height += 1  # restoring height
         width -= 1  # reducing width
         coordinates = search_map_for_pattern(map_to_search, height, width)
         if coordinates == "noneFound":
-            print("we have found no coordinates with height and width: ", height, width)
+            events.debug("map_search_reduce_height", "we have found no coordinates with height and width:  {} {}", height, width)
             height -= 1  # reducing height, so now both height and width are deduced  by 1
     return height, width, coordinates
 
@@ -494,8 +578,8 @@ def action_perform_shoot(player, row, column, map_hidden, map_display, fleet):
     try:
         # If a ship was found at the coordinates
         if ship_name != None:
-            print(f'{player} performed shot on coordinates {row} and {column}, {ship_name} was damaged')
-            print("damaged ship cooordinates are: ", coordinates_list)
+            events.debug("action_perform_shoot", "{} performed shot on coordinates {} and {}, {} was damaged", player, row, column, ship_name)
+            events.debug("action_perform_shoot", "damaged ship cooordinates are:  {}", coordinates_list)
 
             # Handle the logic for a hit ship
             handle_ship_hit(player, row, column, map_hidden, map_display, fleet,
@@ -504,7 +588,7 @@ def action_perform_shoot(player, row, column, map_hidden, map_display, fleet):
 
         else:
             # If no ship was found at the coordinates, it's a miss
-            print(f'{player} performed shot on coordinates {row} and {column}, it was a MISS')
+            events.debug("action_perform_shoot", "{} performed shot on coordinates {} and {}, it was a MISS", player, row, column)
 
             # Handle the logic for a missed shot
             handle_miss(player, row, column, map_hidden, map_display)
@@ -512,7 +596,7 @@ def action_perform_shoot(player, row, column, map_hidden, map_display, fleet):
 
     except Exception as e:
         # Handle any exceptions that occur
-        print(f"An error occurred: {e}")
+        events.warning("action_perform_shoot", "An error occurred: {}", e)
         return None
 
 
@@ -535,6 +619,15 @@ def find_ship_and_coordinates(fleet, target_coordinates):
         Returns (None, None, None, None, None) if no match is found.
     """
 
+    # Fleet with index of ship cells finds the ship with a single lookup
+    if isinstance(fleet, fleet_model.IndexedFleet):
+        found = fleet.find_cell(*target_coordinates)
+        if found is None:
+            return None, None, None, None, None
+        ship_name, coordinates_set_id, coordinates_id = found
+        ship_info = fleet[ship_name]
+        return ship_name, ship_info['Size'], ship_info['Coordinates'][coordinates_set_id], coordinates_set_id, coordinates_id
+
     # Iterate through each ship in the fleet to find matching coordinates
     for ship_name, ship_info in fleet.items():
 
@@ -574,39 +667,36 @@ def handle_ship_hit(player, row, column, map_hidden, map_display, fleet, ship_na
         coordinates_id (int): Index of the coordinates in the list.
 
     Global Variables:
-        game_actions_log (list): Log of game actions.
-        start_time (float): The game start time for logging.
+        game_actions_log (ActionLog): Log of game actions.
         SHIP_SYMBOLS (dict): Symbols used for different states of the ship.
-        cpu_shot_log_tmp (list): Temporary log for CPU actions.
+        cpu_shot_log_tmp (ShotIndex): CPU shots and unsunk hits.
 
     Returns:
         None
     """
 
     # Declare global variables
-    global game_actions_log, start_time, SHIP_SYMBOLS, cpu_shot_log_tmp
+    global game_actions_log, SHIP_SYMBOLS, cpu_shot_log_tmp
 
     # Log CPU actions if the player is CPU
     if player == "CPU":
-        cpu_shot_log_tmp.append([row, column])  # Adding hit coordinates to temporary CPU actions list
-        print(" cpu performed hit shot tomosius ", row, column)
+        cpu_shot_log_tmp.add_hit(row, column)  # Adding hit coordinates to CPU shots and unsunk hits
+        events.debug("handle_ship_hit", " cpu performed hit shot tomosius  {} {}", row, column)
 
     # Check if the ship was completely sunk and update maps
-    print("now will perform check_ship_damaga")
+    events.debug("handle_ship_hit", "now will perform check_ship_damaga")
     check_ship_damage(player, fleet, [row, column], map_display, map_hidden)
 
     # Log the action with details
-    print(player, " made a hit, now we will update log based on coordinates_list: ", coordinates_list)
-    timer = time.time() - start_time  # Calculate the time elapsed since the game started
-    action_outcome = f'{ship_name} was hit'
-    game_actions_log.append([player, timer, row, column, action_outcome])
+    events.debug("handle_ship_hit", "{}  made a hit, now we will update log based on coordinates_list:  {}", player, coordinates_list)
+    game_actions_log.record(player, row, column, action_log.HIT, ship_name)
 
 
     # Update the display map, marking the hit with a different color but the same symbol
     update_display_map(ship_size, row, column, map_display, coordinates_list)
 
     # Output the updated game actions log
-    print("game_actions_log", game_actions_log)
+    events.debug("handle_ship_hit", "game_actions_log {}", game_actions_log)
 
 
 def handle_miss(player, row, column, map_hidden, map_display):
@@ -622,24 +712,22 @@ def handle_miss(player, row, column, map_hidden, map_display):
 
     Global Variables:
         SHIP_SYMBOLS (dict): Symbols used for different states of the ship.
-        start_time (float): The game start time for logging.
-        game_actions_log (list): Log of game actions.
+        game_actions_log (ActionLog): Log of game actions.
+        cpu_shot_log_tmp (ShotIndex): CPU shots and unsunk hits.
 
     Returns:
         None
     """
 
     # Declare global variables
-    global SHIP_SYMBOLS, start_time, game_actions_log
+    global SHIP_SYMBOLS, game_actions_log, cpu_shot_log_tmp
 
-    # Calculate the time elapsed since the game started
-    timer = time.time() - start_time
+    # Log the action into the game actions log, it is timestamped by the log
+    game_actions_log.record(player, row, column, action_log.MISS)
 
-    # Create the action outcome message
-    action_outcome = f'it was a MISS'
-
-    # Log the action into the game actions log
-    game_actions_log.append([player, timer, row, column, action_outcome])
+    # Log CPU shots, so CPU does not need to read maps to know where it has shot
+    if player == "CPU":
+        cpu_shot_log_tmp.add_shot(row, column)
 
     # Update the hidden map to mark the miss
     map_hidden[row][column] = SHIP_SYMBOLS["Miss"][0]
@@ -672,7 +760,7 @@ def update_display_map(ship_size, row, column, map_display, coordinates_list):
     # Detect the alignment of the ship and update it to its 'Sunk' state
     alignment, coordinates_index = find_first_ship_alignment(coordinates_list)
     ship_alignment = alignment + "Sunk"
-    print(" ship alignment is now: ", ship_alignment)
+    events.debug("update_display_map", " ship alignment is now:  {}", ship_alignment)
 
     # If the ship is of size 1, update its symbol directly
     if ship_size == 1:
@@ -705,7 +793,7 @@ def check_ship_damage(player, fleet, coordinates, map_display, map_hidden):
 
     Global Variables:
         start_time (float): Game start time.
-        cpu_shot_log_tmp (list): Temporary log of CPU actions.
+        cpu_shot_log_tmp (ShotIndex): CPU shots and unsunk hits.
         SHIP_SYMBOLS (dict): Symbols for different ship states.
         game_result (str): The result of the game ("Game Over" or None).
 
@@ -725,19 +813,24 @@ def check_ship_damage(player, fleet, coordinates, map_display, map_hidden):
     map_hidden[row][column] = SHIP_SYMBOLS["Hit"][0]
     update_display_map(ship_size, row, column, map_display, coordinates_list)
 
-    print("find_ship_and_coordinates(fleet, coordinates)", coordinates, "tomosius")
+    events.debug("check_ship_damage", "find_ship_and_coordinates(fleet, coordinates) {} tomosius", coordinates)
     alignment, coordinates_index = find_first_ship_alignment(coordinates_list)
-    print("found alignmeent: ", alignment)
-    if ship_size == 1 and (map_hidden[row][column] == SHIP_SYMBOLS["Hit"][0]):
+    events.debug("check_ship_damage", "found alignmeent:  {}", alignment)
+    if isinstance(fleet, fleet_model.IndexedFleet):
+        # Fleet keeps health of every ship, the ship is sunk when its health drops to zero
+        instance, segment_index = fleet.find_ship(row, column)
+        ship_sunk = instance.hit(segment_index)
+        events.debug("check_ship_damage", "{} health is now {}", ship_name, instance.health)
+    elif ship_size == 1 and (map_hidden[row][column] == SHIP_SYMBOLS["Hit"][0]):
         map_hidden[row][column] = map_display[row][column]
         ship_sunk = True
-        print(" it is single ship and status is now 888 ", ship_sunk, ship_size)
-    if ship_size > 1:
+        events.debug("check_ship_damage", " it is single ship and status is now 888  {} {}", ship_sunk, ship_size)
+    elif ship_size > 1:
         # Loop to check if all parts of the ship are damaged
         for coord in coordinates_list:
             row, column = coord  # Extract the row and column coordinates
             if map_hidden[row][column] == SHIP_SYMBOLS["Hit"][0]:
-                print(f'tomosius checking map hiden if {ship_name} is damaged on coordinates {row} and {column}')
+                events.debug("check_ship_damage", "tomosius checking map hiden if {} is damaged on coordinates {} and {}", ship_name, row, column)
                 ship_sunk = True
             else:
                 ship_sunk = False  # Set to False if any part is not damaged
@@ -745,8 +838,8 @@ def check_ship_damage(player, fleet, coordinates, map_display, map_hidden):
         # If the ship is completely damaged (sunk)
     if ship_sunk == True:
         alignment += "Sunk"
-        print(" tomosius ship is sunk", alignment)
-        print("mmmmm id does not remove single ship?", alignment)
+        events.debug("check_ship_damage", " tomosius ship is sunk {}", alignment)
+        events.debug("check_ship_damage", "mmmmm id does not remove single ship? {}", alignment)
         # Various actions to update state and logs
         handle_ship_sunk(player, fleet, ship_name, ship_size, coordinates_list, coordinates_set_id, coordinates_list_id, map_display,
                          map_hidden, alignment)
@@ -771,18 +864,17 @@ def handle_ship_sunk(player, fleet, ship_name, ship_size, coordinates_list, coor
         alignment (str): The alignment of the ship ("Horizontal" or "Vertical").
 
     Global Variables:
-        start_time (float): Game start time.
-        cpu_shot_log_tmp (list): Temporary log of CPU actions.
+        cpu_shot_log_tmp (ShotIndex): CPU shots and unsunk hits.
         SHIP_SYMBOLS (dict): Symbols for different ship states.
-        game_actions_log (list): Log of game actions.
+        game_actions_log (ActionLog): Log of game actions.
         game_result (str): The result of the game ("Game Over" or None).
     """
     # Declare global variables
-    global start_time, cpu_shot_log_tmp, SHIP_SYMBOLS, game_actions_log, game_result
+    global cpu_shot_log_tmp, SHIP_SYMBOLS, game_actions_log, game_result
 
 
-    print(" before updating map, i just want to see map_display, ship_size, coordinates_list[0], alignment, ship_name, fleet", ship_size, coordinates_list[0], alignment, ship_name, coordinates_list_id, coordinates_list)
-    print(len(coordinates_list))
+    events.debug("handle_ship_sunk", " before updating map, i just want to see map_display, ship_size, coordinates_list[0], alignment, ship_name, fleet {} {} {} {} {} {}", ship_size, coordinates_list[0], alignment, ship_name, coordinates_list_id, coordinates_list)
+    events.debug("handle_ship_sunk", "{}", len(coordinates_list))
     if len(coordinates_list) == 1:
         row, column = coordinates_list[0]
         map_display[row][column] = SHIP_SYMBOLS[alignment][0]
@@ -803,24 +895,20 @@ def handle_ship_sunk(player, fleet, ship_name, ship_size, coordinates_list, coor
                 map_hidden[row + i][column] = map_display[row + i][column]
 
     # Record the action in the log
-    timer = time.time() - start_time
-    action_outcome = f'{ship_name} was sunk'
-    game_actions_log.append([player, timer, coordinates_list[0][0], coordinates_list[0][1], action_outcome])
+    game_actions_log.record(player, coordinates_list[0][0], coordinates_list[0][1], action_log.SUNK, ship_name)
 
     # Remove ship coordinates from CPU temporary action log if the player is the CPU
     if player == "CPU":
-        print("now will update cpu shooot log")
-        print(" before updating spu shot log", cpu_shot_log_tmp, "coordinate list:", coordinates_list)
+        events.debug("handle_ship_sunk", "now will update cpu shooot log")
+        events.debug("handle_ship_sunk", " before updating spu shot log {} coordinate list: {}", cpu_shot_log_tmp, coordinates_list)
         cpu_shot_log_tmp = update_cpu_shot_log(coordinates_list)
-        print("after updating cpu shoot log", cpu_shot_log_tmp)
-    print("now should follow coordinates removal")
-    print(" jautiena remove coordinates from fleet ship name", ship_name, "coordinates set id: ", coordinates_set_id)
+        events.debug("handle_ship_sunk", "after updating cpu shoot log {}", cpu_shot_log_tmp)
+    events.debug("handle_ship_sunk", "now should follow coordinates removal")
+    events.debug("handle_ship_sunk", " jautiena remove coordinates from fleet ship name {} coordinates set id:  {}", ship_name, coordinates_set_id)
     remove_coordinates_from_fleet(fleet, ship_name, coordinates_set_id)
     # Check if the game is over
     if not fleet:
-        timer = time.time() - start_time
-        action_outcome = 'Game Over'
-        game_actions_log.append([player, timer, coordinates_list[0][0], coordinates_list[0][1], action_outcome])
+        game_actions_log.record(player, coordinates_list[0][0], coordinates_list[0][1], action_log.GAME_OVER)
         game_result = "Game Over"
 
 
@@ -834,30 +922,37 @@ def remove_coordinates_from_fleet(fleet, ship_name, coordinates_list_set_id):
     - ship_name (str): The name of the ship to update
     - coordinates_list_set_id (int): The index of the set of coordinates to remove
     """
-    print("3463rr3r   4now we will be removing fleet[ship_name][Coordinates][coordinates_list_set_id]", ship_name,
-          coordinates_list_set_id)
-    print_fleet(fleet)
+    events.debug("remove_coordinates_from_fleet", "3463rr3r   4now we will be removing fleet[ship_name][Coordinates][coordinates_list_set_id] {} {}", ship_name, coordinates_list_set_id)
+    if events.is_enabled(events.DEBUG):  # formatting the whole fleet is expensive, only when traced
+        events.debug("remove_coordinates_from_fleet", "{}", format_fleet(fleet))
 
     try:
-        print()
-        print_fleet(fleet)
-        print("now we will be removing fleet[ship_name][Coordinates][coordinates_list_set_id]", ship_name, coordinates_list_set_id)
+        events.debug("remove_coordinates_from_fleet", "now we will be removing fleet[ship_name][Coordinates][coordinates_list_set_id] {} {}", ship_name, coordinates_list_set_id)
         # Remove the entire set of coordinates from the ship
+        removed_coordinates = fleet[ship_name]["Coordinates"][coordinates_list_set_id]
         del fleet[ship_name]["Coordinates"][coordinates_list_set_id]
 
         # Remove any empty coordinate sets
         fleet[ship_name]["Coordinates"] = [coords for coords in fleet[ship_name]["Coordinates"] if coords]
 
-        # Reduce the quantity of this type of ship by 1
-        fleet[ship_name]["Quantity"] -= 1
+        # Reduce the quantity of this type of ship by 1, indexed fleet changes sizes of ships afloat with it
+        if isinstance(fleet, fleet_model.IndexedFleet):
+            fleet.set_quantity(ship_name, fleet[ship_name]["Quantity"] - 1)
+        else:
+            fleet[ship_name]["Quantity"] -= 1
 
         # If the quantity of this type of ship reaches zero, remove it from the fleet
         if fleet[ship_name]["Quantity"] <= 0:
             del fleet[ship_name]
-        print_fleet(fleet)
+
+        # Keep index of ship cells current
+        if isinstance(fleet, fleet_model.IndexedFleet):
+            fleet.unindex_ship(ship_name, removed_coordinates)
+        if events.is_enabled(events.DEBUG):  # formatting the whole fleet is expensive, only when traced
+            events.debug("remove_coordinates_from_fleet", "{}", format_fleet(fleet))
 
     except KeyError:
-        print(f"Failed to remove coordinates for {ship_name}.")
+        events.warning("remove_coordinates_from_fleet", "Failed to remove coordinates for {}.", ship_name)
 
 
 def update_cpu_shot_log(coordinates_list):
@@ -869,21 +964,16 @@ def update_cpu_shot_log(coordinates_list):
     - coordinates_list (list): A list of coordinates that are to be removed.
 
     Returns:
-    - list: Updated CPU shot log.
+    - ShotIndex: Updated CPU shot log.
     """
 
     # Declare global variable to access and modify CPU shot log
     global cpu_shot_log_tmp
 
-    # Exception handling to gracefully manage any runtime errors
-    try:
-        # Loop through each coordinate pair in coordinates_list
-        for coord in coordinates_list:
-            # Remove the coordinate pair from cpu_shot_log_tmp
-            cpu_shot_log_tmp.remove(coord)
-
-    except ValueError as e:
-        print(f"Coordinate not found in log: {e}")
+    # Remove the coordinates of the sunk ship from unsunk hits, each removal is O(1)
+    missing = cpu_shot_log_tmp.remove_hits(coordinates_list)
+    if missing:
+        events.warning("update_cpu_shot_log", "{} coordinates not found in log: {}", missing, coordinates_list)
 
     return cpu_shot_log_tmp
 
@@ -907,7 +997,7 @@ def find_first_ship_alignment(log):
     if len(log) == 0:
         return ('None', None)
     elif len(log) == 1:
-        print("based on spu log find_first_ship_alignment as single")
+        events.debug("find_first_ship_alignment", "based on spu log find_first_ship_alignment as single")
         return ('Single', 0)
 
     # Use enumerate with nested loops to compare each coordinate with every other coordinate
@@ -916,99 +1006,163 @@ def find_first_ship_alignment(log):
 
             # If the rows are the same, it's a horizontal alignment
             if row1 == row2:
-                print(" based on cpu log find_first_ship_alignment as Vertical")
+                events.debug("find_first_ship_alignment", " based on cpu log find_first_ship_alignment as Vertical")
                 return ('Horizontal', i)
             # If the columns are the same, it's a vertical alignment
             elif column1 == column2:
-                print("based on cpu log find_first_ship_alignment as horizontal")
+                events.debug("find_first_ship_alignment", "based on cpu log find_first_ship_alignment as horizontal")
                 return ('Vertical', i)
 
     # If the function hasn't returned by this point, no alignment was found
     return ('None', None)
 
 
-def select_best_shot_based_on_alignment(map_to_search):
+def select_best_shot_based_on_alignment(map_to_search, fleet_to_search=None):
     """
-    Chooses the best coordinates to shoot at based on ship alignment detection.
+    Chooses the best coordinates to shoot at, to finish the damaged ship hit first.
+
+    Unsunk hits are kept in clusters of touching cells. Feasible placements of every ship left through
+    the cluster of the oldest hit are listed, avoiding misses, sunk ships and map edges, and the cell
+    covered by most of them is chosen (see cpu_targeting.best_target_cell).
+    Without fleet sizes, the orientation of the cluster and the two cells extending its segment are used.
+    When both ends of a segment are blocked (the segment is made of ships lying across it), the cluster
+    is a single hit, or hits of adjacent ships form another shape, cells touching the cluster are tried,
+    cells extending a line of hits first.
+    Cells are checked on the padded grid of CPU shots, cells outside of the map are its border, so
+    there are no bounds checks.
 
     Args:
-        map_to_search (list of lists): The map to search for ship coordinates.
-        cpu_shot_log_tmp (list of lists): Temporary log of CPU shots.
-        DEFAULT_SYMBOL (str): The default symbol representing untargeted cells in the map.
+        map_to_search (list of lists): The map to search for ship coordinates, only its size is used (for shot
+            index made without grid), CPU shots are kept by cpu_shot_log_tmp.
+        fleet_to_search (IndexedFleet): Fleet the CPU is shooting at, its sizes of ships afloat are used. Default is None.
+        cpu_shot_log_tmp (ShotIndex): CPU shots and unsunk hits, grid of map size is attached when missing.
 
     Returns:
-        tuple: The chosen column and row coordinates to target next based on the identified ship alignment.
-               Returns (None, None) if no suitable coordinates are found.
+        tuple: The chosen row and column coordinates to target next.
+               Returns (None, None) if there are no unsunk hits.
     """
-    global cpu_shot_log_tmp, DEFAULT_SYMBOL
-    # Detect the alignment of the damaged ship and the index of the last coordinate
-    alignment_info = find_first_ship_alignment(cpu_shot_log_tmp)
-
-    # Return None if no identifiable ship alignment is found
-    if alignment_info is None or alignment_info[0] == 'None':
+    global cpu_shot_log_tmp
+    if len(cpu_shot_log_tmp) == 0:
         return None, None
-
-    alignment, last_index = alignment_info
-
-    # Extract the last coordinate based on the last index
-    last_row, last_column = cpu_shot_log_tmp[last_index]
-
-    # Define the map boundaries
-    max_column = len(map_to_search[0]) - 1
-    max_row = len(map_to_search) - 1
-
-    # Initialize an empty list to hold potential shot coordinates
+    clusters = cpu_shot_log_tmp.clusters
+    grid = cpu_shot_log_tmp.grid
+    if grid is None:
+        grid = cpu_shot_log_tmp.attach_grid(len(map_to_search), len(map_to_search[0]))
+    cells = grid.cells
+
+    # Cluster of the oldest unsunk hit is finished first
+    first_row, first_column = next(iter(cpu_shot_log_tmp))
+    cluster = clusters.find(shot_index.pack(first_row, first_column))
+    alignment = clusters.orientation(cluster)
+    events.debug("select_best_shot_based_on_alignment", "cluster of {} {} is {}", first_row, first_column, alignment)
+
+    # Cell covered by most feasible placements of ships left through the cluster
+    if isinstance(fleet_to_search, fleet_model.IndexedFleet):
+        selected_row, selected_column = cpu_targeting.best_target_cell(grid, clusters.cells(cluster),
+                                                                       fleet_to_search.ship_sizes.counts)
+        if selected_row is not None:
+            events.debug("select_best_shot_based_on_alignment", "found coordinates of most placements {} {}", selected_row, selected_column)
+            return selected_row, selected_column
+
+    # Straight segment, only its two ends need to be checked
     potential_shots = []
-
-    # Define possible shifts based on the ship alignment
-    if alignment == "Vertical":
-        shifts = [[1, 0], [-1, 0]]
-    elif alignment == "Horizontal":
-        shifts = [[0, 1], [0, -1]]
-    elif alignment == "Single":
-        shifts = [[0, 1], [0, -1], [1, 0], [-1, 0]]
-
-    # Loop through the shifts to find the potential shots
-    for coord in cpu_shot_log_tmp:
-        row, column = coord
-        for drow, dcolumn in shifts:
-            new_row, new_column = row + drow, column + dcolumn
-            # Check if the new coordinates are within map boundaries and haven't been shot at before
-            if 0 <= new_row <= max_row and 0 <= new_column <= max_column:
-                # Then check if the cell hasn't been shot at before
-                if map_to_search[new_row][new_column] == DEFAULT_SYMBOL:
-                    potential_shots.append([new_row, new_column])
-                    print("new potentail shots: ", potential_shots)
-
-        if len(potential_shots) > 0:
-            break
+    for row, column in clusters.endpoints(cluster):
+        index = grid.index(row, column)
+        if cells[index] == board.FREE:
+            potential_shots.append(index)
 
     if len(potential_shots) == 0:
-        print("found noo coordinates on select_best_shot_based_on_alignment")
-        shifts = [[0, 1], [0, -1], [1, 0], [-1, 0]]
-        for coord in cpu_shot_log_tmp:
-            row, column = coord
-            for drow, dcolumn in shifts:
-                new_row, new_column = row + drow, column + dcolumn
-                # Check if the new coordinates are within map boundaries and haven't been shot at before
-                if 0 <= new_row <= max_row and 0 <= new_column <= max_column:
-                    # Then check if the cell hasn't been shot at before
-                    if map_to_search[new_row][new_column] == DEFAULT_SYMBOL:
-                        potential_shots.append([new_row, new_column])
-                        print("new potentail shots: ", potential_shots)
-                if len(potential_shots) > 0:
-                    break
-            if len(potential_shots) > 0:
-                break
+        # Cells touching the cluster, the ones extending a line of two hits first
+        extending_shots = []
+        for row, column in clusters.cells(cluster):
+            index = grid.index(row, column)
+            for offset in grid.offsets_4:
+                if cells[index + offset] == board.FREE:
+                    potential_shots.append(index + offset)
+                    # touching hits are always in the same cluster
+                    if cells[index - offset] == board.HIT:
+                        extending_shots.append(index + offset)
+        if extending_shots:
+            potential_shots = extending_shots
+        potential_shots = list(dict.fromkeys(potential_shots))  # cells touching several hits only once
+        if events.is_enabled(events.DEBUG):
+            events.debug("select_best_shot_based_on_alignment", "new potentail shots:  {}",
+                         [grid.coordinates(index) for index in potential_shots])
+
     # Randomly choose one of the potential shots if any are available
     if len(potential_shots) > 0:
-        selected_row, selected_column = random.choice(potential_shots)
-        print("found coordinates on select_best_shot_based_on_alignment", selected_row, selected_column)
+        selected_row, selected_column = grid.coordinates(random.choice(potential_shots))
+        events.debug("select_best_shot_based_on_alignment", "found coordinates on select_best_shot_based_on_alignment {} {}", selected_row, selected_column)
         return selected_row, selected_column
     # Return None, None if no suitable coordinates are found
+    events.debug("select_best_shot_based_on_alignment", "found noo coordinates on select_best_shot_based_on_alignment")
     return None, None
 
 
+def cpu_choose_shooting_coordinates_sampled(fleet_to_search, map_to_search):
+    """
+    Choose shooting coordinates for the CPU hunt phase on very large (tiled) maps: random untouched cells
+    are scored by legal placements of remaining ships through them, see cpu_targeting.sampled_density_cell.
+    Heatmaps and pattern searches would keep lists over the whole map, this reads only cells near the candidates.
+
+    Args:
+        fleet_to_search (dict): Fleet the CPU is shooting at.
+        map_to_search (TiledBoard): The map to search for shooting coordinates (hidden map).
+
+    Returns:
+        The chosen shooting coordinates (row, column).
+    """
+    global DEFAULT_SYMBOL
+    if isinstance(fleet_to_search, fleet_model.IndexedFleet):
+        ship_counts = fleet_to_search.ship_sizes.counts
+    else:
+        ship_counts = {}
+        for ship_info in fleet_to_search.values():
+            ship_counts[ship_info["Size"]] = ship_counts.get(ship_info["Size"], 0) + ship_info["Quantity"]
+    coordinate_row, coordinate_column = cpu_targeting.sampled_density_cell(map_to_search, ship_counts, DEFAULT_SYMBOL)
+    events.debug("cpu_choose_shooting_coordinates_sampled", "cpu_choose_shooting_coordinates_sampled coordinates: {} {}", coordinate_row, coordinate_column)
+    return coordinate_row, coordinate_column
+
+
+def cpu_choose_shooting_coordinates_posterior(fleet_to_search, map_to_search):
+    """
+    Choose shooting coordinates for hard CPU: thousands of layouts of ships afloat, agreeing with every
+    miss, hit and sunk ship of the hidden map, are sampled, the cell occupied in most of them is chosen.
+    Sampling is split across a persistent process pool and stops at posterior_sampler.TIME_BUDGET.
+
+    In "particles" mode (CPU_POSTERIOR_MODE) layouts are kept between moves, only layouts contradicting
+    new shots are dropped and replaced by new samples.
+
+    Args:
+        fleet_to_search (dict): Fleet the CPU is shooting at.
+        map_to_search (Board): The map to search for shooting coordinates (hidden map).
+
+    Global Variables:
+        cpu_particles (ParticleFilter): Layouts kept between moves, in "particles" mode.
+
+    Returns:
+        The chosen shooting coordinates (row, column), (None, None) if no layout was sampled.
+    """
+    global DEFAULT_FLEET, SYMBOL_LAYERS, CPU_POSTERIOR_MODE, cpu_particles
+    height, width = len(map_to_search), len(map_to_search[0])
+    if height * width >= board.TILED_MIN_CELLS:
+        return None, None  # no placement tables for tiled maps
+    if CPU_POSTERIOR_MODE == "particles":
+        # new map (new game) needs new particles
+        if cpu_particles is None or cpu_particles.game_map is not map_to_search:
+            cpu_particles = posterior_sampler.ParticleFilter(map_to_search, SYMBOL_LAYERS, DEFAULT_FLEET)
+        coordinate_row, coordinate_column = cpu_particles.update(fleet_to_search)
+    else:
+        shots, blocked, hits, _ = posterior_sampler.observations(map_to_search, SYMBOL_LAYERS)
+        counts, sampled = posterior_sampler.posterior_counts(height, width, fleet_to_search, DEFAULT_FLEET,
+                                                             blocked, hits)
+        coordinate_row, coordinate_column = posterior_sampler.best_cell(counts, shots, width)
+        events.debug("cpu_choose_shooting_coordinates_posterior", "{} layouts sampled", sampled)
+    events.debug("cpu_choose_shooting_coordinates_posterior", "cpu_choose_shooting_coordinates_posterior coordinates: {} {}",
+                 coordinate_row, coordinate_column)
+    return coordinate_row, coordinate_column
+
+
 def cpu_move():
     """
     Executes the CPU's move during the game.
@@ -1029,39 +1183,90 @@ def cpu_move():
 
     # Declare global variables accessed within the function
     global game_result, fleet_cpu, map_cpu_hidden, map_cpu_display
-    global cpu_shot_log_tmp, game_actions_log, start_time, SHIP_SYMBOLS
+    global cpu_shot_log_tmp, game_actions_log, start_time, SHIP_SYMBOLS, CPU_HUNT_STRATEGY, CPU_DIFFICULTY
 
     # Identify the player as CPU for logging and action purposes
     player = "CPU"
 
+    if CPU_DIFFICULTY == "hard":
+        # Hard CPU shoots the cell most often occupied by sampled layouts, in hunt and target phase alike
+        row, column = cpu_choose_shooting_coordinates_posterior(fleet_cpu, map_cpu_hidden)
+        if row is not None:
+            action_perform_shoot(player, row, column, map_cpu_hidden, map_cpu_display, fleet_cpu)
+            if game_result == "Game Over":
+                events.info("cpu_move", "CPU HAS WON")
+            return
+        events.warning("cpu_move", "no layout was sampled, falling back to normal CPU")
+
     # Check if there are any damaged but unsunk ships in cpu_shot_log_tmp
     if len(cpu_shot_log_tmp) == 0:
-        print("no cpu log tmp was found")
-        # No damaged ships; choose coordinates based on the largest ship in the fleet
-        row, column = cpu_choose_shooting_coordinates_biggest_ship(fleet_cpu, map_cpu_hidden)
+        events.debug("cpu_move", "no cpu log tmp was found")
+        # No damaged ships; choose coordinates based on placements heatmap or the largest ship in the fleet,
+        # very large maps are hunted on sampled cells, as every strategy keeps lists over the whole map
+        if MAP_HEIGHT * MAP_WIDTH >= board.TILED_MIN_CELLS:
+            row, column = cpu_choose_shooting_coordinates_sampled(fleet_cpu, map_cpu_hidden)
+        elif CPU_HUNT_STRATEGY == "density":
+            row, column = cpu_choose_shooting_coordinates_density(fleet_cpu, map_cpu_hidden)
+        elif CPU_HUNT_STRATEGY == "parity":
+            row, column = cpu_choose_shooting_coordinates_parity(fleet_cpu, map_cpu_hidden)
+        else:
+            row, column = cpu_choose_shooting_coordinates_biggest_ship(fleet_cpu, map_cpu_hidden)
         # Perform the shooting action and update game state
         action_perform_shoot(player, row, column, map_cpu_hidden, map_cpu_display, fleet_cpu)
 
         # Check for game over condition
         if game_result == "Game Over":
-            print("CPU HAS WON")
+            events.info("cpu_move", "CPU HAS WON")
     else:
-        print(" i have found this cpu tmp log: ", cpu_shot_log_tmp)
+        events.debug("cpu_move", " i have found this cpu tmp log:  {}", cpu_shot_log_tmp)
         # There are damaged ships; focus on sinking them
-        row, column = select_best_shot_based_on_alignment(map_cpu_hidden)
+        row, column = select_best_shot_based_on_alignment(map_cpu_hidden, fleet_cpu)
         # Perform the shooting action and update game state
         action_perform_shoot(player, row, column, map_cpu_hidden, map_cpu_display, fleet_cpu)
 
         # Check for game over condition
         if game_result == "Game Over":
-            print("CPU HAS WON")
+            events.info("cpu_move", "CPU HAS WON")
+
+
+def new_cpu_game():
+    """
+    Reset game state and deploy CPU ships, so a new CPU vs CPU game can be played.
+
+    Updates:
+        - start_time, game_result, cpu_shot_log_tmp, game_actions_log: reset for the new game.
+        - map_cpu_hidden: new empty board.
+        - fleet_cpu, map_cpu_display: new deployed fleet.
+    """
+    global start_time, game_result, map_cpu_hidden, cpu_shot_log_tmp, game_actions_log
+    start_time = time.time()  # starting timer
+    game_result = None
+    cpu_shot_log_tmp = shot_index.ShotIndex(height=MAP_HEIGHT, width=MAP_WIDTH)
+    game_actions_log = action_log.ActionLog()  # timestamps of actions start from here
+    map_cpu_hidden = initialize_board(MAP_HEIGHT, MAP_WIDTH, DEFAULT_SYMBOL)  # searched every CPU turn
+    if MAP_HEIGHT * MAP_WIDTH < board.TILED_MIN_CELLS:
+        # placement tables, mapped from disk, built only once per map and fleet
+        # (sparse tiled maps skip them, so memory grows with ships and shots only)
+        table_cache.load_tables(MAP_HEIGHT, MAP_WIDTH, DEFAULT_FLEET)
+    cpu_deploy_all_ships()
+
+
+def capture_game_state():
+    """
+    Capture the CPU map being shot at, so shots can be tried on it without changing the live game.
+
+    Returns:
+        GameState: Copy of map_cpu_hidden, map_cpu_display, fleet_cpu, cpu_shot_log_tmp, game_actions_log and game_result.
+    """
+    global map_cpu_hidden, map_cpu_display, fleet_cpu, cpu_shot_log_tmp, game_actions_log, game_result, SHIP_SYMBOLS
+    return game_state.GameState.capture(map_cpu_hidden, map_cpu_display, fleet_cpu, SHIP_SYMBOLS,
+                                        cpu_shot_log_tmp, game_actions_log, game_result)
 
 
 def battleship_game():
     global start_time, map_cpu_hidden, map_cpu_display, cpu_shot_log_tmp, game_actions_log, fleet_cpu
-    start_time = time.time()  # starting timer
     clear_terminal()
-    cpu_deploy_all_ships()
+    new_cpu_game()
     print_two_maps(map_cpu_hidden, map_cpu_display, "hidden_cpu_map", "cpu_map")
     print_fleet(fleet_cpu)
     for i in range(100):
@@ -1079,5 +1284,7 @@ def battleship_game():
             break
 
 
-battleship_game()
-print(" test done")
+if __name__ == "__main__":  # game is played only when this file is run, not when imported
+    events.add_sink(events.StdoutSink(), events.DEBUG)  # showing every traced game action
+    battleship_game()
+    print(" test done")